@@ -1,4 +1,8 @@
+from loltui import startup
+startup.mark('interpreter')
+
 import argparse
+import atexit
 import json
 
 #
@@ -11,7 +15,23 @@ ap.add_argument('--demo', '-d', type=argparse.FileType('r', encoding='U8'),
                 help='supply the program with JSON file where ["myTeam"] = [{"summonerId":<id>, "championId":<id>}...]')
 ap.add_argument('--exe', action='store_true',
                 help='compile loltui to an executable')
+ap.add_argument('--events', action='store_true',
+                help="follow the client's event stream instead of polling")
+ap.add_argument('--workers', type=int, default=10, metavar='N',
+                help='max number of concurrent player info requests')
+ap.add_argument('--record', metavar='FILE',
+                help="save the client's responses to FILE for replaying")
+ap.add_argument('--replay', metavar='FILE',
+                help='serve responses recorded with --record instead of talking to the client')
+ap.add_argument('--fast', action='store_true',
+                help='with --replay, serve responses in order without recorded delays')
+ap.add_argument('--stats', nargs='?', const='text', choices=['text', 'json'],
+                help='print request, rendering and cache statistics on exit')
+ap.add_argument('--profile-startup', action='store_true',
+                help='print time spent in each startup phase on exit')
 args = ap.parse_args()
+if args.profile_startup:
+    startup.enable()
 
 if args.exe:
     from loltui import exe
@@ -21,9 +41,59 @@ if args.exe:
 #
 
 if True:
-    from loltui.client import client
+    from loltui.client import client, configure
     from loltui.playerinfo import *
     from loltui.session import *
+    import loltui.playerinfo
+    loltui.playerinfo.workers = args.workers
+    from loltui import replay
+    configure(events=args.events)
+    if args.record:
+        configure(record=(rec := replay.Recorder(args.record)))
+        atexit.register(rec.close)
+    if args.replay:
+        configure(adapter=replay.Replayer(replay.load(args.replay), not args.fast))
+    startup.mark('imports')
+
+#
+# Statistics
+#
+
+def _stats() -> dict:
+    from loltui.live import live_stats
+    from loltui.runes import scrape_stats, scrapes
+    c = client()
+    return {'endpoints': c.endpoint_stats, 'op.gg': scrape_stats(), 'scrapes': list(scrapes),
+            'connections': c.conn_stats, 'discovery': c.discovery, 'scheduler': c.sched_stats, 'frames': out_stats(),
+            'player cache': cache_stats(), 'live panel': live_stats(), 'player loads': list(loads), 'polling': {k: {
+                'seconds': round(v.time), 'requests': v.requests, 'per_minute': round(v.per_minute, 1)}
+                for k, v in c.poll_stats.items()}}
+
+def _print_stats(fmt: str):
+    from loltui.metrics import report
+    if not client.ready():  # no requests were made, and finding the client could block
+        return
+    st = _stats()
+    if fmt == 'json':
+        def js(x):
+            if hasattr(x, '_asdict'):
+                x = x._asdict()
+            return {str(k): js(v) for k, v in x.items()} if isinstance(x, dict) else [
+                js(v) for v in x] if isinstance(x, list) else x
+        sys.stderr.write(f'{json.dumps(js(st), indent=2)}\n')
+        return
+    lines = [*report(st.pop('endpoints')), '', *report(st.pop('op.gg')), '']
+    lines += [f'scraped {x.champ} {x.role}: {x.wire_bytes / 1024:.1f} KiB, {x.peak_buf} chars buffered at most, '
+              f'{x.elapsed * 1000:.0f} ms{", stopped at the table" if x.early else ""}' for x in st.pop('scrapes')]
+    lines += [f'{k}: {v}' for k, v in st.items() if k not in ('player loads', 'polling')]
+    lines += [f'loaded {x.players} players in {x.requests} requests, first after {x.first * 1000:.0f} ms, '
+              f'all after {x.loaded * 1000:.0f} ms' for x in st['player loads']]
+    lines += [f'{k}: {v["per_minute"]} requests per minute over {v["seconds"]} s'
+              for k, v in st['polling'].items()]
+    sys.stderr.write(''.join(f'{x}\n' for x in lines))
+
+if args.stats:
+    atexit.register(_print_stats, args.stats)
 
 #
 # Demo
@@ -35,7 +105,7 @@ if args.demo:
     cids = [x['championId'] for x in d['myTeam']]
     ses = Session(q, (5, 0), [x['summonerId']
                               for x in d['myTeam']], lambda: cids)
-    ses.loop(1)
+    ses.loop()
     exit(0)
 
 #
@@ -43,11 +113,14 @@ if args.demo:
 #
 
 try:
+    client()  # finding the client draws through out(), which would erase the prompt below
     while True:
         sys.stdout.write(
             f'waiting for session, press {ctell("Ctrl+C")} to abort\r')
-        ses = get_session(1)
+        sys.stdout.flush()
+        startup.mark('first prompt')
+        ses = get_session()
         sys.stdout.write('\033[J')
-        ses.loop(1)
+        ses.loop()
 except KeyboardInterrupt:
     pass
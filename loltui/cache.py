@@ -0,0 +1,153 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import suppress
+from typing import Any, Callable, Hashable, Optional, TypeVar
+
+import requests
+
+#
+# Persistent asset cache
+#
+
+cache_dir = os.path.join(os.environ.get('LOCALAPPDATA') or os.path.join(
+    os.path.expanduser('~'), '.cache'), 'loltui')
+
+def path(name: str) -> str:
+    return os.path.join(cache_dir, name)
+
+def _load(name: str) -> tuple[Optional[bytes], dict]:
+    data, meta = None, {}
+    with suppress(OSError, ValueError):
+        with open(path(name), 'rb') as f:
+            data = f.read()
+        with open(path(name) + '.meta', 'r') as f:
+            meta = json.load(f)
+    return data, meta
+
+def _store(name: str, data: Optional[bytes], meta: dict):
+    os.makedirs(cache_dir, exist_ok=True)
+    for p, x, mode in ((path(name), data, 'wb'), (path(name) + '.meta', json.dumps(meta), 'w')):
+        if x is not None:
+            with open(f'{p}.tmp', mode) as f:
+                f.write(x)
+            os.replace(f'{p}.tmp', p)
+
+def fetch(name: str, url: str, key: Optional[str]) -> bytes:
+    '''
+    Returns contents of url, cached under name. The cached copy is used as-is
+    if it was stored with the same key (or key is None); otherwise it's
+    revalidated with a conditional request. Serves a stale copy if the server
+    can't be reached.
+    '''
+    data, meta = _load(name)
+    if data is not None and (key is None or meta.get('key') == key):
+        return data
+    hdrs = {}
+    if data is not None:
+        if etag := meta.get('etag'):
+            hdrs['If-None-Match'] = etag
+        if lm := meta.get('last-modified'):
+            hdrs['If-Modified-Since'] = lm
+    try:
+        res = requests.get(url, headers=hdrs, timeout=10)
+        if res.status_code == 304 and data is not None:
+            _store(name, None, meta | {'key': key})
+            return data
+        res.raise_for_status()
+    except requests.RequestException:
+        if data is None:
+            raise
+        return data
+    meta = {k: v for k in ('etag', 'last-modified')
+            if (v := res.headers.get(k))}
+    _store(name, res.content, meta | {'key': key})
+    return res.content
+
+def load(name: str, key: str) -> Optional[Any]:
+    '''
+    Returns JSON cached under name if it was stored with the same key
+    '''
+    data, meta = _load(name)
+    if data is not None and meta.get('key') == key:
+        with suppress(ValueError):
+            return json.loads(data)
+
+def save(name: str, key: str, val: Any):
+    _store(name, json.dumps(val).encode(), {'key': key})
+
+def memo_json(name: str, key: str, fn: Callable[[], Any]) -> Any:
+    '''
+    Returns JSON cached under name if it was stored with the same key,
+    otherwise calls fn and caches the result
+    '''
+    if (val := load(name, key)) is None:
+        save(name, key, val := fn())
+    return val
+
+#
+# In-memory cache
+#
+
+class TTLCache:
+    '''
+    Thread-safe LRU mapping of at most maxsize entries, each of which expires
+    after the ttl it was set with
+    '''
+
+    def __init__(self, maxsize: int):
+        self.__lk = threading.Lock()
+        self.__d: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.__max = maxsize
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.__lk:
+            if (x := self.__d.get(key)) is None:
+                return default
+            if x[0] <= time.time():
+                del self.__d[key]
+                return default
+            self.__d.move_to_end(key)
+            return x[1]
+
+    def set(self, key: Hashable, val: Any, ttl: float):
+        self.put(key, val, time.time() + ttl)
+
+    def put(self, key: Hashable, val: Any, expiry: float):
+        with self.__lk:
+            self.__d[key] = expiry, val
+            self.__d.move_to_end(key)
+            while len(self.__d) > self.__max:
+                self.__d.popitem(last=False)
+
+    def items(self) -> list[tuple[Hashable, float, Any]]:
+        '''
+        Returns (key, expiry, value) of live entries, least recently used first
+        '''
+        now = time.time()
+        with self.__lk:
+            return [(k, t, v) for k, (t, v) in self.__d.items() if t > now]
+
+_T = TypeVar('_T')
+def lazy(fn: Callable[[], _T]) -> Callable[[], _T]:
+    '''
+    Memoizes a nullary function, calling it at most once even across threads;
+    its reset() forgets the value, so the next call computes it anew, and
+    ready() tells whether there's a value without computing it
+    '''
+    lk, res = threading.Lock(), []
+    @functools.wraps(fn)
+    def wrap() -> _T:
+        if not res:
+            with lk:
+                if not res:
+                    res.append(fn())
+        return res[0]
+    def reset():
+        with lk:
+            res.clear()
+    wrap.reset, wrap.ready = reset, lambda: bool(res)
+    return wrap
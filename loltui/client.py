@@ -1,76 +1,238 @@
+import asyncio
+import base64
 import json
-import os
-import tempfile
+import threading
 import time
 from contextlib import suppress
-from typing import Any, Optional, TypeVar
-from urllib.request import urlopen
+from typing import Any, Awaitable, NamedTuple, Optional, TypeVar
 
-import psutil
 import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
 from requests.models import Response
+from urllib3.connection import HTTPSConnection
+from urllib3.connectionpool import HTTPSConnectionPool
 
+from loltui import cache, discovery, startup
+from loltui.cache import lazy
+from loltui.events import Events
 from loltui.output import *
+from loltui.metrics import EndpointStats, Metrics, template
+from loltui.polling import PhaseStats, Poller, Wake
+from loltui.ratelimit import INTERACTIVE, SchedStats, Scheduler
+from loltui.replay import Recorder
 
 _ReqFn = TypeVar('_ReqFn', bound=Callable[..., Any])
 def _retrying_request(c, f: _ReqFn) -> _ReqFn:
-    def wrap(endpoint: str, *args, **kwargs):
+    def wrap(endpoint: str, *args, prio: int = INTERACTIVE, **kwargs):
+        tpl, retry = template(endpoint), False
         while True:
-            res = f(f'https://127.0.0.1:{c._port}/{endpoint}', *args, **kwargs, headers={
-                'Accept': 'application/json'}, auth=('riot', c._token), verify=c._cert)
+            t = time.perf_counter()
+            c._sched.acquire(prio)
+            if retry:
+                c.metrics.retried(tpl, time.perf_counter() - t)
+            res = c._timed(tpl, f, f'https://127.0.0.1:{c._port}/{endpoint}', *args, **kwargs)
             # https://developer.riotgames.com/docs/portal#web-apis_4xx-error-codes
             if res.status_code != 429:
                 return res
-            time.sleep(float(res.headers['Retry-After']))
+            c._sched.throttle(float(res.headers.get('Retry-After', 1)))
+            retry = True
     return wrap
 
-def _get_port_and_token() -> tuple[str, str]:
+def _discover() -> discovery.Found:
     out(f'waiting for client, press {ctell("Ctrl+C")} to abort')
-    while True:
-        with suppress(FileNotFoundError, StopIteration, psutil.NoSuchProcess):
-            p = psutil.Process
-            exe = next(p(c.pid).exe() for c in psutil.net_connections('tcp4') if p(
-                c.pid).name() == 'LeagueClient.exe' and c.status == 'LISTEN')
-            with open(os.path.join(os.path.dirname(exe), 'lockfile'), 'r') as f:
-                _, _, port, token, _ = f.read().split(':')
-            out_rm()
-            return port, token
-        time.sleep(2)
+    found = discovery.discover()
+    out_rm()
+    return found
+
+#
+# Connection pooling
+#
+
+class ConnStats(NamedTuple):
+    requests: int
+    connects: int
+    connect_time: float  # seconds spent on TCP connect and TLS handshake
+
+    @property
+    def per_request(self) -> float:
+        return self.connect_time / self.requests if self.requests else 0.
+
+class _PoolAdapter(HTTPAdapter):
+    '''
+    Keeps up to pool_size connections alive, timing connection establishment
+    '''
+
+    def __init__(self, pool_size: int):
+        self.__lk = threading.Lock()
+        self.__stats = ConnStats(0, 0, 0.)
+        super().__init__(pool_connections=1, pool_maxsize=pool_size)
+
+    def __add(self, *d):
+        with self.__lk:
+            self.__stats = ConnStats(*map(sum, zip(self.__stats, d)))
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        add = self.__add
+        class Conn(HTTPSConnection):
+            def connect(self):
+                t = time.perf_counter()
+                super().connect()
+                add(0, 1, time.perf_counter() - t)
+        class Pool(HTTPSConnectionPool):
+            ConnectionCls = Conn
+        self.poolmanager.pool_classes_by_scheme = self.poolmanager.pool_classes_by_scheme | {
+            'https': Pool}
+
+    def send(self, *args, **kwargs):
+        self.__add(1, 0, 0.)
+        return super().send(*args, **kwargs)
+
+    @property
+    def stats(self) -> ConnStats:
+        return self.__stats
+
+def _session(cert: str, pool_size: int, **kwargs) -> requests.Session:
+    s = requests.Session()
+    s.mount('https://', _PoolAdapter(pool_size))
+    s.headers['Accept'] = 'application/json'
+    s.verify = cert
+    s.trust_env = False  # local endpoints: no proxies, no CA bundle override
+    for k, v in kwargs.items():
+        setattr(s, k, v)
+    return s
+
+#
+# LCU client
+#
+
+_EVENT_EPS = ['lol-gameflow/v1/gameflow-phase', 'lol-champ-select/v1/session']
+_CERT_URL = 'https://static.developer.riotgames.com/docs/lol/riotgames.pem'
+_DDRAGON = 'https://ddragon.leagueoflegends.com'
 
 class Client:
-    def __init__(self):
-        certfd, self._cert = tempfile.mkstemp(suffix='.pem')
-        os.write(certfd, urlopen(
-            'https://static.developer.riotgames.com/docs/lol/riotgames.pem').read())
-        os.close(certfd)
-        self._port, self._token = _get_port_and_token()
-        self.get = _retrying_request(self, requests.get)
-        self.post = _retrying_request(self, requests.post)
-        self.put = _retrying_request(self, requests.put)
-        self.patch = _retrying_request(self, requests.patch)
-        self.delete = _retrying_request(self, requests.delete)
-        self.__v = json.loads(urlopen(
-            f'https://ddragon.leagueoflegends.com/realms/{self.get_json("riotclient/region-locale")["region"].lower()}.json').read())['v']
-        self.__cs = {int(x['key']): x for x in json.loads(urlopen(
-            f'https://ddragon.leagueoflegends.com/cdn/{self.__v}/data/en_US/champion.json').read())['data'].values()}
+    def __init__(self, *, pool_size: int = 10, rate: float = 20, burst: int = 40, events: bool = False,
+                 record: Optional[Recorder] = None, adapter: Optional[BaseAdapter] = None):
+        if adapter:  # stand-in for the client, e.g. a Replayer
+            self._cert, self._port, self._token = None, '0', ''
+            self.discovery: Optional[discovery.Found] = None
+        else:
+            cache.fetch('riotgames.pem', _CERT_URL, None)
+            self._cert = cache.path('riotgames.pem')
+            startup.mark('certificate')
+            self.discovery = _discover()
+            self._port, self._token = self.discovery.port, self.discovery.token
+            startup.mark('client discovery')
+        self._lcu = _session(self._cert, pool_size, auth=('riot', self._token))
+        self._live = _session(self._cert, pool_size)
+        for s in (self._lcu, self._live):
+            if adapter:
+                s.mount('https://', adapter)
+            if record:
+                record.attach(s)
+        self._sched = Scheduler(rate, burst)
+        self.events: Optional[Events] = None
+        self.metrics = Metrics()
+        self.wake = Wake()  # set when there may be something new to poll
+        self.poller = Poller(self.wake, lambda: self.requests)
+        self.get = _retrying_request(self, self._lcu.get)
+        self.post = _retrying_request(self, self._lcu.post)
+        self.put = _retrying_request(self, self._lcu.put)
+        self.patch = _retrying_request(self, self._lcu.patch)
+        self.delete = _retrying_request(self, self._lcu.delete)
+
+        # Static data is revalidated only when the client gets patched
+        gv = self.get_json('lol-patch/v1/game-version')
+        region = self.get_json('riotclient/region-locale')['region'].lower()
+        self.__v = json.loads(cache.fetch(
+            f'realm-{region}.json', f'{_DDRAGON}/realms/{region}.json', gv))['v']
+        if not adapter:
+            cache.fetch('riotgames.pem', _CERT_URL, self.__v)
+        self.__cs = {int(x['key']): x for x in json.loads(cache.fetch(
+            'champion.json', f'{_DDRAGON}/cdn/{self.__v}/data/en_US/champion.json', self.__v))['data'].values()}
+        startup.mark('static data')
+        if events and not adapter:
+            self.listen()
+
+    def listen(self):
+        '''
+        Subscribes to endpoints pushed over the client's WebSocket, so that
+        get_json() serves them without polling while the socket is up
+        '''
+        auth = base64.b64encode(f'riot:{self._token}'.encode()).decode()
+        self.events = Events(f'wss://127.0.0.1:{self._port}/', _EVENT_EPS, self.wake,
+                             header={'Authorization': f'Basic {auth}'}, sslopt={'ca_certs': self._cert})
+
+    def wait(self, phase: Optional[str], active: bool = False, redraw: Optional[Callable[[], Any]] = None):
+        '''
+        Sleeps for the polling interval of given client phase, or until an
+        event wakes the client up; active tells that the last poll found
+        changes. Meanwhile, wake.redraw() calls redraw without a poll.
+        '''
+        self.poller.wait(phase if isinstance(phase, str) else None, active, redraw)
 
     def get_json(self, endpoint: str, **kwargs) -> dict:
-        return self.get(endpoint, **kwargs).json()
+        if self.events and (val := self.events.get(endpoint)) is not None:
+            return val
+        val = self.get(endpoint, **kwargs).json()
+        if self.events:
+            self.events.seed(endpoint, val)
+        return val
 
-    def game(self, endpoint: str, **kwargs) -> Optional[dict]:
+    def _timed(self, tpl: str, f: Callable[..., Response], *args, **kwargs) -> Response:
+        '''
+        Calls f, recording the response (or connection error) under tpl
+        '''
+        t = time.perf_counter()
+        try:
+            res = f(*args, **kwargs)
+        except requests.ConnectionError:
+            self.metrics.record(tpl, time.perf_counter() - t, 0, 0)
+            raise
+        self.metrics.record(tpl, time.perf_counter() - t, len(res.content), res.status_code)
+        return res
+
+    def game_raw(self, endpoint: str, **kwargs) -> Optional[bytes]:
+        '''
+        Returns the undecoded response of the live client, if one's running
+        '''
         port = 2999  # fixed port per Riot docs
         with suppress(requests.ConnectionError):
-            res = requests.get(
-                f'https://127.0.0.1:{port}/{endpoint}',
-                params=kwargs,
-                headers={
-                    'Accept': 'application/json'},
-                verify=self._cert)
+            res = self._timed(template(endpoint), self._live.get,
+                              f'https://127.0.0.1:{port}/{endpoint}', params=kwargs)
             if res.status_code == 200:
-                return json.loads(res.content)
+                return res.content
 
-    def __del__(self):
-        os.remove(self._cert)
+    def game(self, endpoint: str, **kwargs) -> Optional[dict]:
+        if (b := self.game_raw(endpoint, **kwargs)) is not None:
+            return json.loads(b)
+
+    @property
+    def conn_stats(self) -> dict[str, ConnStats]:
+        '''
+        Request and connection establishment counts of the LCU and live client
+        '''
+        return {k: a.stats for k, s in (('lcu', self._lcu), ('live', self._live))
+                if isinstance(a := s.get_adapter('https://'), _PoolAdapter)}
+
+    @property
+    def requests(self) -> int:
+        '''
+        Number of requests made to the LCU and the live client, retries included
+        '''
+        return sum(x.count for x in self.metrics.snapshot().values())
+
+    @property
+    def poll_stats(self) -> dict[Optional[str], PhaseStats]:
+        return self.poller.stats
+
+    @property
+    def endpoint_stats(self) -> dict[str, EndpointStats]:
+        return self.metrics.snapshot()
+
+    @property
+    def sched_stats(self) -> SchedStats:
+        return self._sched.stats
 
     @property
     def version(self) -> str:
@@ -80,7 +242,64 @@ class Client:
     def champions(self) -> dict[int, dict]:
         return self.__cs
 
-qdata = {x['queueId']: x for x in json.loads(urlopen(
-    'https://static.developer.riotgames.com/docs/lol/queues.json').read())}
+#
+# Asyncio interface
+#
+
+_T = TypeVar('_T')
+def _awaitable(f: Callable[..., _T]) -> Callable[..., Awaitable[_T]]:
+    async def wrap(*args, **kwargs) -> _T:
+        return await asyncio.to_thread(f, *args, **kwargs)
+    return wrap
+
+class AsyncClient:
+    '''
+    Awaitable counterpart of Client. Requests run on the event loop's worker
+    threads through the wrapped Client, sharing its connection pools,
+    scheduler, 429 handling, and metrics.
+    '''
+
+    def __init__(self, c: Client):
+        self.sync = c
+        self.get = _awaitable(c.get)
+        self.post = _awaitable(c.post)
+        self.put = _awaitable(c.put)
+        self.patch = _awaitable(c.patch)
+        self.delete = _awaitable(c.delete)
+        self.get_json = _awaitable(c.get_json)
+        self.game = _awaitable(c.game)
+        self.game_raw = _awaitable(c.game_raw)
+
+_opts = {}
+def configure(*, reset: bool = False, **kwargs):
+    '''
+    Sets keyword arguments for Client; has effect only before client() is
+    called, unless reset, which also drops the options and clients set so far
+    '''
+    if reset:
+        _opts.clear()
+        for f in (client, aclient, qdata):
+            f.reset()
+    _opts.update(kwargs)
+
+@lazy
+def client() -> Client:
+    return Client(**_opts)
+
+@lazy
+def aclient() -> AsyncClient:
+    return AsyncClient(client())
+
+@lazy
+def event_loop() -> asyncio.AbstractEventLoop:
+    '''
+    Returns the event loop background tasks run on, in a thread of its own
+    '''
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
 
-client = Client()
+@lazy
+def qdata() -> dict[int, dict]:
+    return {x['queueId']: x for x in json.loads(cache.fetch(
+        'queues.json', 'https://static.developer.riotgames.com/docs/lol/queues.json', client().version))}
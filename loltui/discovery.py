@@ -0,0 +1,73 @@
+import os
+import time
+from contextlib import suppress
+from typing import NamedTuple, Optional
+
+import psutil
+
+from loltui import cache
+
+#
+# Client discovery
+#
+
+_EXES = {'LeagueClient.exe', 'LeagueClientUx.exe'}
+_DEFAULT_DIRS = [r'C:\Riot Games\League of Legends']
+_REMEMBERED = 'install.json'
+
+class Found(NamedTuple):
+    port: str
+    token: str
+    dir: str        # install directory
+    scans: int      # process lookups it took
+    elapsed: float  # seconds until found
+
+def _find_install() -> Optional[str]:
+    '''
+    Returns the directory of a running client, looked up by process name
+    '''
+    for p in psutil.process_iter(['name', 'exe']):
+        if p.info['name'] in _EXES and p.info['exe']:
+            return os.path.dirname(p.info['exe'])
+
+def _read(path: str) -> Optional[tuple[str, str]]:
+    '''
+    Returns port and token of a lockfile written by a running client
+    '''
+    with suppress(OSError, ValueError):
+        with open(path, 'r') as f:
+            _, pid, port, token, _ = f.read().split(':')
+        if psutil.pid_exists(int(pid)):  # a crashed client leaves its lockfile behind
+            return port, token
+
+def discover(*, interval: float = .5, scan_every: float = 5.) -> Found:
+    '''
+    Blocks until the client is running. Lockfiles in the last known and
+    default install directories are watched by polling their stat; running
+    processes are looked up, every scan_every seconds, only while none of
+    these has a valid lockfile.
+    '''
+    t0, scans, next_scan = time.perf_counter(), 0, 0.
+    last = (cache.load(_REMEMBERED, '1') or {}).get('dir')
+    dirs = [*filter(None, [last]), *_DEFAULT_DIRS]
+    seen: dict[str, tuple] = {}  # stat of each lockfile as last read
+    while True:
+        for d in dict.fromkeys(dirs):
+            path = os.path.join(d, 'lockfile')
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if seen.get(path) == (sig := (st.st_ino, st.st_mtime_ns, st.st_size)):
+                continue  # unchanged since it was found stale
+            seen[path] = sig
+            if creds := _read(path):
+                if d != last:
+                    cache.save(_REMEMBERED, '1', {'dir': d})
+                return Found(*creds, d, scans, time.perf_counter() - t0)
+        if (now := time.monotonic()) >= next_scan:
+            scans, next_scan = scans + 1, now + scan_every
+            if (d := _find_install()) and d not in dirs:
+                dirs.insert(0, d)
+                continue
+        time.sleep(interval)
@@ -0,0 +1,86 @@
+import json
+import threading
+import time
+from typing import Any, Iterable, Optional
+
+import websocket
+
+from loltui.polling import Wake
+
+#
+# LCU event stream
+#
+
+class Events:
+    '''
+    Mirrors LCU endpoints pushed over the client's WebSocket. While connected,
+    get() serves the latest pushed value of a subscribed endpoint; once the
+    socket drops it returns None so callers fall back to polling.
+    '''
+
+    def __init__(self, url: str, endpoints: Iterable[str], wake: Wake, *,
+                 header: Optional[dict] = None, sslopt: Optional[dict] = None):
+        self.__eps = list(endpoints)
+        self.__wake = wake
+        self.__lk = threading.Lock()
+        self.__data: Optional[dict[str, Any]] = None  # None while disconnected
+        self.__closed = False
+        self.__ws = websocket.WebSocketApp(
+            url, header=header, on_open=self.__open, on_message=self.__message,
+            on_close=self.__close, on_error=self.__error)
+        threading.Thread(target=self.__run, args=(sslopt,), daemon=True).start()
+
+    def __run(self, sslopt: Optional[dict]):
+        while not self.__closed:
+            self.__ws.run_forever(sslopt=sslopt)
+            time.sleep(5)  # reconnect delay
+
+    def __open(self, ws):
+        # WAMP 1.0: [5, topic] subscribes, events arrive as [8, topic, payload]
+        for ep in self.__eps:
+            ws.send(json.dumps([5, f'OnJsonApiEvent_{ep.replace("/", "_")}']))
+        with self.__lk:
+            self.__data = {}
+
+    def __message(self, ws, msg: str):
+        try:
+            code, _, ev = json.loads(msg)
+            uri, data = ev['uri'].lstrip('/'), ev['data'] if ev['eventType'] != 'Delete' else {}
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return  # not an event, e.g. a WAMP welcome or call result
+        if code != 8:
+            return
+        with self.__lk:
+            if self.__data is None:
+                return
+            self.__data[uri] = data
+        self.__wake.set()
+
+    def __error(self, ws, err: Exception):
+        if isinstance(err, (OSError, websocket.WebSocketException)):
+            self.__close(ws)
+
+    def __close(self, ws, *args):
+        with self.__lk:
+            self.__data = None
+        self.__wake.set()
+
+    @property
+    def connected(self) -> bool:
+        return self.__data is not None
+
+    def get(self, endpoint: str) -> Optional[Any]:
+        with self.__lk:
+            return self.__data.get(endpoint) if self.__data is not None else None
+
+    def seed(self, endpoint: str, val: Any):
+        '''
+        Stores a polled value unless a newer one has already been pushed
+        '''
+        with self.__lk:
+            if self.__data is not None and endpoint in self.__eps:
+                self.__data.setdefault(endpoint, val)
+
+    def close(self):
+        self.__closed = True
+        self.__ws.close()
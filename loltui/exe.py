@@ -25,7 +25,8 @@ with tempfile.TemporaryDirectory() as d_tmp:
                            'PyInstaller',
                            'psutil',
                            'requests',
-                           'keyboard'], shell=True)
+                           'keyboard',
+                           'websocket-client'], shell=True)
 
     d_src = os.path.dirname(__file__)
     subprocess.check_call([os.path.join(d_tmp, 'Scripts', 'python'), '-OO', '-m', 'PyInstaller',
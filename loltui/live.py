@@ -0,0 +1,142 @@
+import json
+import threading
+from typing import NamedTuple, Optional
+
+from loltui.client import client
+from loltui.output import *
+
+#
+# Live game panel
+#
+
+interval = .5  # seconds between polls of the live client
+
+class Line(NamedTuple):
+    champ: str
+    kills: int
+    deaths: int
+    assists: int
+    cs: int
+    gold: int  # worth of the items held
+
+def _line(p: dict) -> Line:
+    s = p['scores']
+    return Line(p['championName'], s['kills'], s['deaths'], s['assists'], s['creepScore'],
+                sum(x['price'] * x['count'] for x in p['items']))
+
+def diff(old: dict[str, Line], new: dict[str, Line]) -> dict[str, tuple[int, ...]]:
+    '''
+    Returns indices of the fields that differ, per player; all of them for
+    players not in old
+    '''
+    return {k: tuple(i for i, v in enumerate(x) if o is None or o[i] != v)
+            for k, x in new.items() if (o := old.get(k)) != x}
+
+_fmt = (  # cell of each field
+    lambda x: Cell(x, ctell),
+    lambda x: Cell(f' {x}'),
+    lambda x: Cell(f'/{x}'),
+    lambda x: Cell(f'/{x}'),
+    lambda x: Cell(f' {x} cs', cgray),
+    lambda x: Cell(f' {x / 1000:.1f}K', cgray))
+
+class LiveStats(NamedTuple):
+    polls: int
+    decoded: int  # polls whose response differed from the last one
+    cells: int    # rebuilt for changed fields
+
+_stats = LiveStats(0, 0, 0)
+_stats_lk = threading.Lock()
+
+def _count(polls: int = 0, decoded: int = 0, cells: int = 0):
+    global _stats
+    with _stats_lk:
+        _stats = LiveStats(_stats.polls + polls, _stats.decoded + decoded, _stats.cells + cells)
+
+def live_stats() -> LiveStats:
+    '''
+    Returns the amount of live client polls, responses decoded, and cells rebuilt
+    '''
+    return _stats
+
+class LivePanel:
+    '''
+    KDA, CS and item worth of each player, polled from the live client on a
+    thread of its own, which asks for a redraw on changes. Responses identical
+    to the last one aren't decoded, and only cells of changed fields are rebuilt.
+    '''
+
+    def __init__(self, title: str = 'Live'):
+        self.__title = title
+        self.__raw: Optional[bytes] = None  # last response
+        self.__lines: dict[str, Line] = {}
+        self.__teams: dict[str, str] = {}
+        self.__dirty: dict[str, set[int]] = {}  # fields changed since last update()
+        self.__cells: dict[str, list[Cell]] = {}
+        self.__lk = threading.Lock()
+        self.__seek: Optional[int] = None
+        self.__stop = threading.Event()
+        threading.Thread(target=self.__poller, daemon=True).start()
+
+    def __poller(self):
+        while True:
+            if self.poll():
+                client().wake.redraw()  # nothing new to poll the LCU for
+            if self.__stop.wait(interval):
+                return
+
+    def poll(self) -> bool:
+        '''
+        Polls the live client once; returns whether any field changed
+        '''
+        if (raw := client().game_raw('liveclientdata/playerlist')) is None or raw == self.__raw:
+            _count(polls=1)
+            return False
+        _count(polls=1, decoded=1)
+        self.__raw, ps = raw, json.loads(raw)
+        new = {p['summonerName']: _line(p) for p in ps}
+        with self.__lk:
+            d = diff(self.__lines, new)
+            self.__lines, self.__teams = new, {p['summonerName']: p['team'] for p in ps}
+            for k, fs in d.items():
+                self.__dirty.setdefault(k, set()).update(fs)
+        return bool(d)
+
+    def __rows(self) -> list[list[Cell]]:
+        with self.__lk:
+            lines, teams, dirty, self.__dirty = self.__lines, self.__teams, self.__dirty, {}
+        n = 0
+        for k, fs in dirty.items():
+            cells = self.__cells.setdefault(k, [Cell('')] * len(Line._fields))
+            for i in fs:
+                cells[i] = _fmt[i](lines[k][i])
+            n += len(fs)
+        _count(cells=n)
+        sep, rows, team = Cell('', cgray, '─'), [], None
+        for k in lines:
+            if team is not None and teams[k] != team:
+                rows.append([*[sep] * len(Line._fields), Cell('')])
+            rows.append([*self.__cells[k], Cell('')])
+            team = teams[k]
+        return rows
+
+    def update(self, redraw: bool = False) -> bool:
+        '''
+        Presents changes since the last update; redraw tells that the panel was
+        cleared off the screen, so it must be shown again regardless
+        '''
+        with self.__lk:
+            if not self.__lines or not (self.__dirty or redraw):
+                return False
+        if self.__seek is not None and not redraw:
+            self.clear()
+        self.__seek = out_sz()
+        box(*self.__rows(), title=self.__title)
+        return True
+
+    def clear(self):
+        if self.__seek is not None and (n := out_sz() - self.__seek):
+            out_rm(n)
+
+    def close(self):
+        self.__stop.set()
@@ -0,0 +1,100 @@
+import sqlite3
+import threading
+from contextlib import suppress
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+#
+# Match history store
+#
+
+Page = list[tuple[int, Optional[bool]]]  # game ids, newest first, and ranked outcomes
+Fetch = Callable[[int, int], Page]        # returns games from begin to end index, newest first
+
+class MatchStore:
+    '''
+    Ranked game outcomes per player, persisted in SQLite. A player's history
+    is kept contiguous from their latest game: sync() fetches games newer
+    than the latest one seen, then pages further back in the background.
+    '''
+
+    def __init__(self, path: str, *, page: int = 20, max_pages: int = 10):
+        self.__db = sqlite3.connect(path, check_same_thread=False)
+        self.__db.executescript('''
+            CREATE TABLE IF NOT EXISTS games(
+                player TEXT, game INTEGER, win INTEGER, PRIMARY KEY(player, game));
+            CREATE TABLE IF NOT EXISTS histories(
+                player TEXT PRIMARY KEY, newest INTEGER, depth INTEGER, done INTEGER);''')
+        self.__dblk = threading.Lock()
+        self.__lks: dict[str, threading.Lock] = {}
+        self.__page, self.__max_pages = page, max_pages
+        self.__pool = ThreadPoolExecutor(2)
+
+    def __q(self, sql: str, *args) -> list[tuple]:
+        with self.__dblk, self.__db:
+            return self.__db.execute(sql, args).fetchall()
+
+    def __lk(self, player: str) -> threading.Lock:
+        with self.__dblk:
+            return self.__lks.setdefault(player, threading.Lock())
+
+    def __history(self, player: str) -> tuple[Optional[int], int, bool]:
+        rows = self.__q('SELECT newest, depth, done FROM histories WHERE player=?', player)
+        newest, depth, done = rows[0] if rows else (None, 0, False)
+        return newest, depth, bool(done)
+
+    def __store(self, player: str, games: Page, newest: Optional[int], depth: int, done: bool):
+        with self.__dblk, self.__db:
+            self.__db.executemany('INSERT OR IGNORE INTO games VALUES(?, ?, ?)',
+                                  [(player, g, w) for g, w in games if w is not None])
+            self.__db.execute('INSERT OR REPLACE INTO histories VALUES(?, ?, ?, ?)',
+                              (player, newest, depth, done))
+
+    def ranked(self, player: str) -> int:
+        return self.__q('SELECT COUNT(*) FROM games WHERE player=?', player)[0][0]
+
+    def outcomes(self, player: str, n: int) -> list[bool]:
+        '''
+        Returns outcomes of the n latest ranked games, oldest first
+        '''
+        return [bool(w) for w, in self.__q(
+            'SELECT win FROM games WHERE player=? ORDER BY game DESC LIMIT ?', player, n)][::-1]
+
+    def sync(self, player: str, fetch: Fetch, want: int) -> Optional[Future]:
+        '''
+        Fetches games newer than the latest stored one; if fewer than want
+        ranked games are then known, returns the future of paging back
+        '''
+        with self.__lk(player):
+            newest, depth, done = self.__history(player)
+            new: Page = []
+            for i in range(self.__max_pages):
+                page = fetch(i * self.__page, (i + 1) * self.__page)
+                fresh = [x for x in page if newest is None or x[0] > newest]
+                new += fresh
+                if newest is None or len(fresh) < len(page) or len(page) < self.__page:
+                    break
+            else:  # too far behind to page up to the stored games, so start over
+                self.__q('DELETE FROM games WHERE player=?', player)
+                depth, done = 0, False
+            if newest is None:
+                done = len(new) < self.__page
+            self.__store(player, new, max((g for g, _ in new), default=newest),
+                         depth + len(new), done)
+        if not done and self.ranked(player) < want:
+            with suppress(RuntimeError):  # no new work once exiting
+                return self.__pool.submit(self.__backfill, player, fetch, want)
+
+    def __backfill(self, player: str, fetch: Fetch, want: int):
+        while self.ranked(player) < want:
+            with self.__lk(player):
+                newest, depth, done = self.__history(player)
+                if done:
+                    return
+                page = fetch(depth, depth + self.__page)
+                self.__store(player, page, newest, depth + len(page), len(page) < self.__page)
+
+    def close(self):
+        self.__pool.shutdown(cancel_futures=True)
+        with self.__dblk:
+            self.__db.close()
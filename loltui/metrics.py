@@ -0,0 +1,83 @@
+import bisect
+import re
+import threading
+from collections import Counter
+from typing import NamedTuple, Optional
+
+#
+# Per-endpoint request metrics
+#
+
+BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1., 2.5, 5.)  # latency histogram bounds, in seconds
+
+_id = re.compile(r'(?<=/)(\d+|[0-9a-f]{8}(-[0-9a-f]{4}){3}-[0-9a-f]{12})(?=/|$)')
+def template(endpoint: str) -> str:
+    '''
+    Returns endpoint with its query and numeric ids and UUIDs replaced by {id}
+    '''
+    return _id.sub('{id}', endpoint.partition('?')[0].lstrip('/'))
+
+class EndpointStats(NamedTuple):
+    count: int
+    latency: float       # total seconds spent waiting for responses
+    bytes: int           # response bodies, decoded
+    retry_time: float    # seconds spent waiting out 429s before retrying
+    statuses: dict[int, int]  # status 0 counts connection errors
+    histogram: tuple[int, ...]  # latencies up to each of BUCKETS, and above
+
+    def quantile(self, q: float) -> Optional[float]:
+        '''
+        Returns the bucket bound under which given fraction of latencies fall
+        '''
+        if not self.count:
+            return None
+        n = 0
+        for b, x in zip((*BUCKETS, float('inf')), self.histogram):
+            if (n := n + x) >= q * self.count:
+                return b
+
+class Metrics:
+    '''
+    Thread-safe accumulator of EndpointStats keyed by endpoint template
+    '''
+
+    def __init__(self):
+        self.__lk = threading.Lock()
+        self.__eps: dict[str, list] = {}
+
+    def __get(self, tpl: str) -> list:
+        if (ep := self.__eps.get(tpl)) is None:
+            ep = self.__eps[tpl] = [0, 0., 0, 0., Counter(), [0] * (len(BUCKETS) + 1)]
+        return ep
+
+    def record(self, tpl: str, latency: float, nbytes: int, status: int):
+        with self.__lk:
+            ep = self.__get(tpl)
+            ep[0] += 1
+            ep[1] += latency
+            ep[2] += nbytes
+            ep[4][status] += 1
+            ep[5][bisect.bisect_left(BUCKETS, latency)] += 1
+
+    def retried(self, tpl: str, wait: float):
+        with self.__lk:
+            self.__get(tpl)[3] += wait
+
+    def snapshot(self) -> dict[str, EndpointStats]:
+        with self.__lk:
+            return {k: EndpointStats(c, l, b, r, dict(s), tuple(h))
+                    for k, (c, l, b, r, s, h) in self.__eps.items()}
+
+def report(stats: dict[str, EndpointStats]) -> list[str]:
+    '''
+    Returns a table of given stats, the most time-consuming endpoints first
+    '''
+    def ms(x: Optional[float]) -> str:
+        return '-' if x is None else '>5000' if x == float('inf') else f'{x * 1000:.0f}'
+    w = max((len(k) for k in stats), default=8)
+    lines = [f'{"endpoint":<{w}} {"count":>6} {"avg ms":>7} {"p50≤":>6} {"p95≤":>6} {"KiB":>8} {"retry s":>7}  statuses']
+    for k, s in sorted(stats.items(), key=lambda x: -x[1].latency):
+        lines.append(f'{k:<{w}} {s.count:>6} {s.latency / max(s.count, 1) * 1000:>7.1f} {ms(s.quantile(.5)):>6} '
+                     f'{ms(s.quantile(.95)):>6} {s.bytes / 1024:>8.1f} {s.retry_time:>7.2f}  '
+                     f'{" ".join(f"{c}:{n}" for c, n in sorted(s.statuses.items()))}')
+    return lines
@@ -2,7 +2,10 @@ import atexit
 import os
 import re
 import sys
-from typing import Callable, Iterable, Optional
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, NamedTuple, Optional, Sequence, Union
 
 import keyboard
 
@@ -52,47 +55,179 @@ def button_unsub(subs: list):
 # Mutable display output
 #
 
-_buf: list[str] = []
+_buf: list[str] = []  # lines to be shown
+_scr: list[str] = []  # lines shown on the terminal
+_lk = threading.RLock()
 _w = sys.stdout.write
 if 'pytest' not in sys.modules:
     _w(f'{CSI}?25l')
     atexit.register(lambda: _w(f'{CSI}?25h'))
 
+class FrameStats(NamedTuple):
+    frames: int
+    bytes: int
+    writes: int
+
+frame_time = 1 / 30  # min seconds between frames
+_stats = FrameStats(0, 0, 0)
+_last = 0.
+_timer: Optional[threading.Timer] = None
+_batch = 0
+
+# https://en.wikipedia.org/wiki/ANSI_escape_code#CSI_(Control_Sequence_Introducer)_sequences
+def _move(a: int, b: int) -> str:
+    return f'{CSI}{a-b}A' if a > b else f'{CSI}{b-a}B' if a < b else ''
+
+def _frame() -> str:
+    '''
+    Returns output that turns _scr into _buf, rewriting changed lines only;
+    the cursor is kept at the start of the line below the last one
+    '''
+    s, cur, n = [], len(_scr), len(_buf)
+    for i, (a, b) in enumerate(zip(_scr, _buf)):
+        if a != b:
+            s.append(f'{_move(cur, i)}\r{b}{CSI}K')
+            cur = i
+    if n < len(_scr):
+        s.append(f'{_move(cur, n)}\r{CSI}J')
+    elif s or n > len(_scr):
+        s.append(f'{_move(cur, len(_scr))}\r{"".join(f"{x}{LF}" for x in _buf[len(_scr):])}')
+    return ''.join(s)
+
+def _flush():
+    global _timer, _last, _stats
+    with _lk:
+        if _timer:
+            _timer.cancel()
+            _timer = None
+        if s := _frame():
+            _w(s)
+            sys.stdout.flush()
+            _stats = FrameStats(
+                _stats.frames + 1, _stats.bytes + len(s.encode()), _stats.writes + 1)
+        _scr[:] = _buf
+        _last = time.monotonic()
+atexit.register(_flush)
+
+def _present():
+    '''
+    Flushes changes as one frame, deferring it if the last one was too recent
+    '''
+    global _timer
+    with _lk:
+        if _timer or _batch:
+            return
+        if (d := _last + frame_time - time.monotonic()) > 0:
+            _timer = threading.Timer(d, _flush)
+            _timer.daemon = True
+            _timer.start()
+        else:
+            _flush()
+
+@contextmanager
+def frame():
+    '''
+    Batches output done within the context into a single frame
+    '''
+    global _batch
+    with _lk:
+        _batch += 1
+    try:
+        yield
+    finally:
+        with _lk:
+            _batch -= 1
+            _present()
+
 def out(x: Iterable[str]):
-    start = len(_buf)
-    _buf.extend([x] if isinstance(x, str) else x)
-    if len(_buf) != start:
-        _w(f'{LF.join(_buf[start:])}\n')
+    with _lk:
+        _buf.extend([x] if isinstance(x, str) else x)
+        _present()
 
 def out_sz() -> int:
     return len(_buf)
 
-# https://en.wikipedia.org/wiki/ANSI_escape_code#CSI_(Control_Sequence_Introducer)_sequences
 def out_rm(n: int = 1):
     assert n > 0
-    del _buf[-n:]
-    _w(f'\033[{n}A\r\033[J')
+    with _lk:
+        del _buf[-n:]
+        _present()
+
+def out_stats() -> FrameStats:
+    '''
+    Returns the amount of frames flushed, and bytes and writes they took
+    '''
+    return _stats
 
 #
 # Columned table
 #
 
-def _aligned(l: list[str]):
-    idx = [x.find('\0') for x in l]
-    if (m := max(idx, default=-1)) == -1:
-        return l
-    for i, j in enumerate(idx):
-        if j != -1:
-            l[i] = f'{l[i][:j]}{" "*(m - j)}{l[i][j+1:]}'
-    return _aligned(l)
+class Cell(NamedTuple):
+    text: str
+    color: Optional[Callable[[str], str]] = None
+    fill: str = ' '  # used for padding the cell to its column's width
+
+    @property
+    def width(self) -> int:
+        return len(self.text)
+
+Column = Union[Cell, Sequence[Cell]]  # adjacent cells share a column
+
+def _widths(rows: Iterable[list[int]]) -> list[int]:
+    '''
+    Returns column widths given the cell widths of each row; the last cell of
+    a row is left unpadded, so it doesn't count
+    '''
+    ws = []
+    for row in rows:
+        ws.extend([0] * (len(row) - 1 - len(ws)))
+        for i, x in enumerate(row[:-1]):
+            if x > ws[i]:
+                ws[i] = x
+    return ws
+
+def _render(row: list[list[Cell]], ws: list[int]) -> tuple[str, str]:
+    '''
+    Returns given row laid out to column widths as plain and colored text
+    '''
+    segs = []  # (text, color), with adjacent same-colored text merged
+    def put(text: str, color):
+        if segs and segs[-1][1] is color:
+            segs[-1][0].append(text)
+        elif text:
+            segs.append(([text], color))
+    for i, col in enumerate(row):
+        for c in col:
+            put(c.text, c.color)
+        if i < len(row) - 1:
+            c = col[-1] if col else Cell('')
+            put(c.fill * (ws[i] - sum(c.width for c in col)), c.color)
+    plain = ''.join(''.join(t) for t, _ in segs)
+    return plain, ''.join(f(''.join(t)) if f else ''.join(t) for t, f in segs)
+
+def _layout(rows: list[list[list[Cell]]]) -> list[tuple[str, str]]:
+    '''
+    Returns given rows laid out to shared column widths as plain and colored text
+    '''
+    ws = _widths([sum(c.width for c in col) for col in row] for row in rows)
+    return [_render(row, ws) for row in rows]
 
 # https://en.wikipedia.org/wiki/Box-drawing_character
-def box(*l, post=lambda i, x: x, title=''):
-    l = _aligned([str(x).rstrip() for x in l])
-    w = max((len(title), *map(len, l)))
+def box(*l: Union[str, Sequence[Column]], post=lambda i, x: x, title=''):
+    '''
+    Outputs a box of given rows. A row is either a string whose columns are
+    \0-separated, or a sequence of (groups of) cells. Strings get colored by
+    post, which is given the index and aligned text of the row.
+    '''
+    def text(x) -> bool:
+        return isinstance(x, str) or not isinstance(x, Sequence)
+    rows = [[[Cell(c)] for c in str(x).rstrip().split('\0')] if text(x) else
+            [[c] if isinstance(c, Cell) else list(c) for c in x] for x in l]
+    l = [(p, post(i, p) if text(x) else c) for i, (x, (p, c)) in enumerate(zip(l, _layout(rows)))]
+    w = max((len(title), *(len(p) for p, _ in l)))
     title = f'╼{title}╾' if title else ""
     out([
         cgray(f'╭{title}{"─"*(w+2-len(title))}╮'),
-        *[f'{cgray("│")} {post(i, ln)}{" "*(w-len(ln))} {cgray("│")}' for i,
-          ln in enumerate(l)],
+        *[f'{cgray("│")} {ln}{" "*(w-len(p))} {cgray("│")}' for p, ln in l],
         f'{cgray("╰"+"─"*(w+2)+"╯")}'])
@@ -1,17 +1,70 @@
+import asyncio
+import json
+import os
 import queue
-import re
 import threading
+import time
+from array import array
+from collections import Counter, deque
+from concurrent.futures import Future
 from contextlib import suppress
-from typing import Iterable
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable, Iterable, NamedTuple, Optional
 
-from loltui.client import client
+import requests
+
+from loltui import cache
+from loltui.cache import TTLCache, lazy
+from loltui.client import aclient, client, event_loop
+from loltui.matches import MatchStore, Page
 from loltui.output import *
+from loltui.ratelimit import BACKGROUND
+
+#
+# Player data cache, shared across sessions
+#
+
+_ttl = {  # seconds to keep each kind of player data
+    'summoner': 3600,
+    'ranked': 600,
+    'mastery': 600,
+    'matches': 120}  # match history is synced at most this often
+_pcache = TTLCache(256)
+_pcache_lk = threading.Lock()
+_pcache_stats = Counter()
+
+def _lookup(field: str, key: Hashable) -> Any:
+    hit = (val := _pcache.get((field, key))) is not None
+    with _pcache_lk:
+        _pcache_stats[field, hit] += 1
+    return val
+
+def _cached(field: str, key: Hashable, fn: Callable[[], Any]) -> Any:
+    '''
+    Returns given field of a player from the cache, or caches fn()
+    '''
+    if (val := _lookup(field, key)) is None:
+        _pcache.set((field, key), val := fn(), _ttl[field])
+    return val
+
+async def _acached(field: str, key: Hashable, fn: Callable[[], Awaitable]) -> Any:
+    '''
+    Returns given field of a player from the cache, or caches await fn()
+    '''
+    if (val := _lookup(field, key)) is None:
+        _pcache.set((field, key), val := await fn(), _ttl[field])
+    return val
+
+def cache_stats() -> dict[str, tuple[int, int]]:
+    '''
+    Returns hits and misses of the player data cache per field
+    '''
+    with _pcache_lk:
+        return {k: (_pcache_stats[k, True], _pcache_stats[k, False]) for k in _ttl}
 
 #
 # Player info presenter
 #
 
-_prank = re.compile(r'\t(\w\d)?(→)?(\w\d)?')
 _crank = {  # rank colorizers
     'I': colorizer(8),
     'B': colorizer(95),
@@ -22,77 +75,285 @@ _crank = {  # rank colorizers
     'M': colorizer(12),
     'C': colorizer(50)}
 
-def _wins_losses(info) -> list[bool]:
+ranked_games = 20  # ranked outcomes to show per player
+
+@lazy
+def _matches() -> MatchStore:
+    os.makedirs(cache.cache_dir, exist_ok=True)
+    return MatchStore(cache.path('matches.sqlite'))
+
+def _wins_losses(info, timeout: Optional[float] = None) -> tuple[list[bool], Optional[Future]]:
     '''
-    Gets outcome of ranked games from 20 last games
+    Returns outcomes of the latest ranked games, and the future of paging in
+    older games if too few are known yet
     '''
-    acc = info['accountId']
-    ml = client.get_json(f'lol-match-history/v1/friend-matchlists/{acc}')
-    gs = [g for g in ml.get('games', {'games': []})['games']
-          [::-1] if g['queueId'] in (420, 440)]
-    def f(g):
+    acc, puuid, fut = info['accountId'], info['puuid'], None
+    def win(g) -> Optional[bool]:
         with suppress(StopIteration):
             pi = next(x['participantId'] for x in g['participantIdentities']
                       if x['player']['accountId'] == acc)
             return next(x['stats']['win']
                         for x in g['participants'] if x['participantId'] == pi)
-    return list(filter(lambda x: x is not None, map(f, gs)))
+    def fetch(beg: int, end: int) -> Page:
+        res = client().get(f'lol-match-history/v1/products/lol/{puuid}/matches',
+                           params={'begIndex': beg, 'endIndex': end}, timeout=timeout, prio=BACKGROUND)
+        res.raise_for_status()
+        return [(g['gameId'], win(g) if g['queueId'] in (420, 440) else None)
+                for g in res.json()['games']['games']]
+    def sync() -> bool:
+        nonlocal fut
+        fut = _matches().sync(puuid, fetch, ranked_games)
+        return True
+    _cached('matches', puuid, sync)  # the store is synced at most once per TTL
+    return _matches().outcomes(puuid, ranked_games), fut
 
 _divs = ['I', 'II', 'III', 'IV', 'V']
-def _id2player(sid: str) -> tuple[dict, str, list]:
+def _rank(q: dict) -> list[Cell]:
     '''
-    Returns summoner info, rank, and masteries
+    Returns last season end rank and current rank as cells
     '''
-    d = client.get_json(f'lol-summoner/v1/summoners/{sid}')
-    q = client.get_json(
-        f'lol-ranked/v1/ranked-stats/{d["puuid"]}')['queueMap']['RANKED_SOLO_5x5']
     def fmt(t: str, d: str):
         return f'{t[0].upper()}{_divs.index(d)+1}' if d != 'NA' else ''
-    rank = f'{fmt(q["previousSeasonEndTier"], q["previousSeasonEndDivision"])}→{fmt(q["tier"], q["division"])}'
-    cm = client.get_json(
-        f'lol-collections/v1/inventories/{d["summonerId"]}/champion-mastery')
-    return d, rank if rank != '→' else '', cm
+    a, b = fmt(q["previousSeasonEndTier"], q["previousSeasonEndDivision"]), fmt(q["tier"], q["division"])
+    if not a and not b:
+        return []
+    return [Cell(a, _crank[a[0]] if a else None), Cell('→', cgray), Cell(b, _crank[b[0]] if b else None)]
+
+_batch = True  # whether the client serves multi-id summoner queries
+def _cached_summoners(sids: list[int]) -> tuple[dict[int, dict], list[int]]:
+    '''
+    Returns cached summoner info by id, and ids of the summoners not cached
+    '''
+    ds = {sid: d for sid in sids if (d := _pcache.get(('summoner', sid))) is not None}
+    miss = [x for x in dict.fromkeys(sids) if x not in ds]
+    with _pcache_lk:
+        _pcache_stats['summoner', True] += len(sids) - len(miss)
+        _pcache_stats['summoner', False] += len(miss)
+    return ds, miss
+
+def _batched(res: requests.Response) -> dict[int, dict]:
+    '''
+    Returns summoner info by id from the response to a multi-id query
+    '''
+    global _batch
+    if res.ok:
+        return {d['summonerId']: d for d in res.json()}
+    if res.status_code == 404:  # older clients only look up one at a time
+        _batch = False
+    return {}
+
+def _cache_summoners(ds: dict[int, dict], miss: list[int], sids: list[int]) -> list[dict]:
+    for sid in miss:
+        _pcache.set(('summoner', sid), ds[sid], _ttl['summoner'])
+    return [ds[x] for x in sids]
+
+async def _summoners(sids: list[int], get_json: Callable[..., Awaitable]) -> list[dict]:
+    '''
+    Returns summoner info of each given summoner; those not cached are looked
+    up with a single request, or concurrently one by one if the client can't
+    '''
+    ds, miss = _cached_summoners(sids)
+    if miss and _batch:
+        ds |= _batched(await aclient().get('lol-summoner/v2/summoners', params={'ids': json.dumps(miss)}))
+    if rest := [x for x in miss if x not in ds]:
+        ds |= zip(rest, await asyncio.gather(*(get_json(f'lol-summoner/v1/summoners/{sid}') for sid in rest)))
+    return _cache_summoners(ds, miss, sids)
+
+class Masteries:
+    '''
+    Champion ids and mastery points of a player, in the order the client
+    lists them (most points first), as parallel arrays
+    '''
+    __slots__ = 'ids', 'points', '__pos'
+
+    def __init__(self, cm: list[dict]):
+        self.ids = array('H', [x['championId'] for x in cm])
+        self.points = array('I', [x['championPoints'] for x in cm])
+        self.__pos = array('H', bytes(2 * (max(self.ids, default=0) + 1)))  # index + 1 by champ id
+        for i, c in enumerate(self.ids):
+            self.__pos[c] = i + 1
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def index(self, cid: int) -> Optional[int]:
+        '''
+        Returns the position of given champ, or None if it has no mastery
+        '''
+        return self.__pos[cid] - 1 if 0 <= cid < len(self.__pos) and self.__pos[cid] else None
+
+    def top(self, n: int) -> Iterable[tuple[int, int]]:
+        '''
+        Returns ids and points of the n first champs
+        '''
+        return zip(self.ids[:n], self.points[:n])
+
+workers = 10  # concurrency limit for player info requests
+async def _players(sids: Iterable[str]) -> AsyncIterator[tuple[int, int, Any]]:
+    '''
+    Yields player index, field index, and value as summoner info (0), rank
+    (1), and masteries (2) of given summoners arrive; a field that couldn't
+    be loaded has the exception as its value
+    '''
+    sids = [int(x) for x in sids]
+    sem = asyncio.Semaphore(workers)
+    async def get_json(endpoint: str, **kwargs) -> Any:
+        async with sem:
+            return await aclient().get_json(endpoint, **kwargs)
+    async def ranked(d: dict) -> dict:
+        return (await get_json(f'lol-ranked/v1/ranked-stats/{d["puuid"]}'))['queueMap']['RANKED_SOLO_5x5']
+    async def mastery(d: dict) -> Masteries:
+        return Masteries(await get_json(f'lol-collections/v1/inventories/{d["summonerId"]}/champion-mastery',
+                                        prio=BACKGROUND))
+    async def field(i: int, k: int, aw: Awaitable) -> tuple[int, int, Any]:
+        try:
+            return i, k, _rank(await aw) if k == 1 else await aw
+        except Exception as e:  # the other fields still get filled in
+            return i, k, e
+    try:
+        ds = await _summoners(sids, get_json)
+    except Exception as e:  # then there's nothing to look the rest up by
+        for i in range(len(sids)):
+            for k in range(3):
+                yield i, k, e
+        return
+    for i, d in enumerate(ds):
+        yield i, 0, d
+    fs = [field(i, 1, _acached('ranked', d['puuid'], lambda d=d: ranked(d))) for i, d in enumerate(ds)]
+    fs += [field(i, 2, _acached('mastery', d['summonerId'], lambda d=d: mastery(d))) for i, d in enumerate(ds)]
+    for f in asyncio.as_completed(fs):
+        yield await f
+
+_player_eps = ('lol-summoner/v2/summoners', 'lol-summoner/v1/summoners/{id}', 'lol-ranked/v1/ranked-stats/{id}',
+               'lol-collections/v1/inventories/{id}/champion-mastery')
+def _player_requests() -> int:
+    '''
+    Returns how many requests have been made for player info so far
+    '''
+    st = client().endpoint_stats
+    return sum(st[x].count for x in _player_eps if x in st)
+
+class Load(NamedTuple):
+    players: int
+    requests: int  # client requests made to load the players
+    first: float   # seconds until a player's info first arrived
+    loaded: float  # seconds until every player was filled in
+
+loads: deque[Load] = deque(maxlen=64)  # most recent player table loads
+
+_failed = Cell('?', cyell)  # in place of data that failed to load
 
 class PlayerInfo:
-    def __wl_calc(self):
-        for i, wl in enumerate(_wins_losses(x[0]) for x in self.__ps):
+    '''
+    Table of players' rank, masteries, and recent ranked outcomes. It's shown
+    at once with placeholder rows, which fill in as each player's info arrives.
+    '''
+
+    async def __wl_calc(self, infos: list[Optional[dict]], timeout: float):
+        def put(i: int, wl: list[bool]):
             if wl:
                 self.__qwl.put((i, ''.join(map(str, map(int, wl)))))
+        sem = asyncio.Semaphore(workers)
+        async def wins_losses(i: int, info: dict) -> tuple[int, tuple[list[bool], Optional[Future]]]:
+            async with sem:
+                try:
+                    return i, await asyncio.to_thread(_wins_losses, info, timeout)
+                except Exception:  # the other players' outcomes still get filled in
+                    return i, ([], None)
+        async def backfill(i: int, fut: Future):
+            await asyncio.wait([asyncio.wrap_future(fut)])
+            with suppress(Exception):  # then the outcomes shown so far stay
+                if not fut.exception():
+                    put(i, await asyncio.to_thread(_matches().outcomes, infos[i]['puuid'], ranked_games))
+                    client().wake.redraw()  # else it would wait for the next, backed-off poll
+        more = []  # older games being paged in
+        for f in asyncio.as_completed([wins_losses(i, x) for i, x in enumerate(infos) if x]):
+            i, (wl, fut) = await f
+            put(i, wl)
+            if fut:
+                more.append(backfill(i, fut))
+        client().wake.set()
+        await asyncio.gather(*more)
+
+    async def __load(self, sids: list[str], timeout: float):
+        n, infos, wl, first = _player_requests(), [None for _ in sids], None, None
+        async for i, k, v in _players(sids):
+            if first is None:
+                first = time.perf_counter() - self.__t0
+            self.__qp.put((i, k, v))
+            client().wake.redraw()
+            if k == 0 and isinstance(v, dict):
+                infos[i] = v
+                if i == len(sids) - 1:  # names are in; win-losses need nothing more
+                    wl = asyncio.create_task(self.__wl_calc(infos, timeout))
+        t = time.perf_counter() - self.__t0
+        loads.append(Load(len(sids), _player_requests() - n, t if first is None else first, t))
+        if wl:
+            await wl
+
+    def __loaded(self, fut: Future):
+        if not fut.cancelled() and (e := fut.exception()):
+            self.__qp.put((None, None, e))  # whatever hasn't arrived yet won't
+            client().wake.redraw()
 
     def __init__(self, geom: tuple[int, int],
-                 summoner_ids: Iterable[str], show_fn):
+                 summoner_ids: Iterable[str], show_fn, *, wl_timeout: float = 5):
+        self.__t0 = time.perf_counter()
         self.__sep = geom[0]
-        self.__ps = [_id2player(x) for x in summoner_ids]
-        self.__cid2mi = [{x['championId']: i for i,
-                          x in enumerate(cm)} for _, _, cm in self.__ps]
-        self.__wl = ['' for _ in self.__ps]
+        sids = list(summoner_ids)
+        self.__ps: list[list] = [[None, None, None] for _ in sids]  # filled in by update()
+        self.__wl = ['' for _ in sids]
+        self.__rowcache: list[Optional[tuple]] = [None for _ in sids]
         self.__seek = out_sz()
         self.__champs = []
         self.__show_fn = show_fn
+        self.__qp = queue.Queue()
         self.__qwl = queue.Queue()
-        threading.Thread(target=self.__wl_calc, daemon=True).start()
+        self.__err: Optional[Exception] = None  # that stopped the load midway
+        asyncio.run_coroutine_threadsafe(self.__load(sids, wl_timeout), event_loop()).add_done_callback(self.__loaded)
 
-    def get(self) -> Iterable[str]:
+    def __rows(self, i: int) -> tuple[list[Column], list[Column]]:
         '''
-        Returns all lines of the table. Use self.post() for post-processing.
+        Returns the two rows of given player, rebuilt only if they've changed
         '''
-        T = '\0 '  # 0-terminator, used for aligning info
-        cg = client.champions.__getitem__
+        info, rank, cs = (self.__err if x is None else x for x in self.__ps[i])
+        cid, idx, wl = self.__champs[i], self.__champidx[i], self.__wl[i]
+        if (rows := self.__rowcache[i]) and rows[0] == (cid, wl):
+            return rows[1]
+        t, g = ctell, cgray
         def cname(c: int) -> str:
-            return cg(c)['name']
+            return client().champions[c]['name']
+        def champ(pre: str, c: int) -> Column:
+            return (Cell(pre, g), Cell(cname(c), t if c == cid else g))
+        def pts(pre: str, p: int, hl: bool) -> Column:
+            return Cell(f'{pre}{p // 1000}K', None if hl else g)
+        name = (Cell('…', g) if info is None else _failed if isinstance(info, Exception)
+                else Cell(info['displayName'], t))
+        l1 = [(name, Cell(' '), *([_failed] if isinstance(rank, Exception) else rank or []))]
+        l2 = [[Cell('•', t if y == '1' else g) for y in wl]]
+        if not isinstance(cs, Masteries):  # yet to arrive, or failed to
+            l1 += [(Cell(' │ ', g), _failed)] if cs is not None else []
+            l1 += [champ(' ' if cs is not None else ' │ ', cid)] if cid else []
+        else:
+            n = 8 if cid and (idx is None or idx > 9) else 10
+            l1 += [champ(' │ ' if j == 0 else ' ', c) for j, (c, _) in enumerate(cs.top(n))]
+            l2 += [pts(' │ ' if j == 0 else ' ', p, j == idx) for j, (_, p) in enumerate(cs.top(n))]
+            if n == 8:  # hovered champ isn't among the top 10
+                l1 += [Cell(' ...', g), champ(' ', cid)]
+                l2 += [Cell('    '), pts(' ', cs.points[idx] if idx else 0, True)]
+        rows = l1 + [Cell('')], l2 + [Cell('')]
+        self.__rowcache[i] = (cid, wl), rows
+        return rows
+
+    def get(self) -> Iterable[list[Column]]:
+        '''
+        Returns all rows of the table
+        '''
+        sep = Cell('', cgray, '─')
         for i in range(len(self.__champs)):
-            info, rank, cs = self.__ps[i]
-            idx = self.__champidx[i]
-            name = info['displayName'] + '\t' + rank
             if i == self.__sep:
-                yield '\0 ┼' + '\0' * 11
-            if self.__champs[i] and (idx is None or idx > 9):
-                yield f'{name}{T}│ {T.join(cname(c["championId"]) for c in cs[:8])}{T}...{T}{cname(self.__champs[i])}{T}'
-                pts = cs[idx]['championPoints'] // 1000 if idx else 0
-                yield f'{self.__wl[i]}{T}│ {T.join(str(c["championPoints"]//1000)+"K" for c in cs[:8])}{T}...{T}{pts}K{T}'
-            else:
-                yield f'{name}{T}│ {T.join(cname(c["championId"]) for c in cs[:10])}{T}'
-                yield f'{self.__wl[i]}{T}│ {T.join(str(c["championPoints"]//1000)+"K" for c in cs[:10])}{T}'
+                yield [sep, sep._replace(text='─┼'), *[sep] * 9, Cell('')]
+            yield from self.__rows(i)
 
     def clear(self):
         if n := out_sz() - self.__seek:
@@ -103,7 +364,15 @@ class PlayerInfo:
         Updates the presented table to match given champ selections
         '''
 
-        # Get any finished win-loss calculations
+        # Get any arrived player info and finished win-loss calculations
+        while not self.__qp.empty():
+            i, k, v = self.__qp.get()
+            if i is None:
+                self.__err, self.__rowcache = v, [None for _ in self.__rowcache]
+            else:
+                self.__ps[i][k] = v
+                self.__rowcache[i] = None
+            self.__champs = []
         while not self.__qwl.empty():
             i, wl = self.__qwl.get()
             self.__wl[i] = wl
@@ -113,53 +382,6 @@ class PlayerInfo:
         if self.__champs == cids:
             return False
         self.__champs = cids
-        self.__champidx = [x.get(y) for x, y in zip(self.__cid2mi, cids)]
+        self.__champidx = [cm.index(c) if isinstance(cm, Masteries) else None for (_, _, cm), c in zip(self.__ps, cids)]
         self.__show_fn()
         return True
-
-    def post(self, i: int, x: str):
-        '''
-        Applies post-processing effects (e.g. coloring) to given line
-        '''
-        t, g = ctell, cgray
-
-        if i == self.__sep * 2:
-            return g(x.replace(' ', '─'))
-        if i > self.__sep * 2:
-            i -= 1
-        j = i // 2  # player idx
-
-        # Line 2: mastery points
-        def pts(i, x: str):
-            if (ell := x.find('...')) != -1:
-                return f'{g(x[:ell])}   {x[ell+3:]}'
-            if (idx := self.__champidx[j]) is None:
-                return g(x)
-            b = x.index('K') + 1
-            while idx:
-                b = x.index('K', b) + 1
-                idx = idx - 1
-            a = x.rindex(' ', 0, b)
-            return f'{g(x[:a])}{x[a:b]}{g(x[b:])}'
-
-        # Line 1: champ names
-        def champ(x: str):
-            if not self.__champs[j]:
-                return g(x)
-            key = client.champions[self.__champs[j]]['name']
-            a = x.index(key)
-            b = a + len(key)
-            return f'{g(x[:a])}{t(x[a:b])}{g(x[b:])}'
-
-        if i % 2:  # odd idx => line 2
-            if i == len(self.__champs) * 2 - 1:
-                self.clear()
-            nwl = x.index(' ')
-            wl = ''.join((t if y == '1' else g)('•') for y in x[:nwl])
-            return f'{wl}{pts(j, x[nwl:])}'
-        else:  # even idx => line 1
-            m = _prank.search(x)
-            def color(y): return _crank[y[0]](y)
-            rank = f'{color(m[1]) if m[1] else ""}{cgray(m[2]) if m[2] else ""}{color(m[3]) if m[3] else ""}'
-            a, b = m.span()
-            return f'{t(x[:a])} {rank}{champ(x[b:])}'
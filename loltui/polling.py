@@ -0,0 +1,112 @@
+import threading
+import time
+from typing import Any, Callable, NamedTuple, Optional
+
+#
+# Adaptive polling
+#
+
+intervals = {  # shortest and longest polling interval per client phase, in seconds
+    'ChampSelect': (.25, 1.),
+    'ReadyCheck': (.5, .5),
+    'Matchmaking': (1., 2.),
+    'InProgress': (2., 16.),
+    None: (1., 8.)}  # any other phase
+
+class Wake:
+    '''
+    A threading.Event for waking a Poller up. Besides the flag, which asks for
+    a poll, redraw() asks only for a redraw; take_any() returns and resets
+    both at once, so a set() can't slip in between and get lost.
+    '''
+
+    def __init__(self):
+        self.__cv = threading.Condition()
+        self.__flag = self.__draw = False
+
+    def set(self):
+        with self.__cv:
+            self.__flag = True
+            self.__cv.notify_all()
+
+    def redraw(self):
+        with self.__cv:
+            self.__draw = True
+            self.__cv.notify_all()
+
+    def clear(self):
+        with self.__cv:
+            self.__flag = False
+
+    def is_set(self) -> bool:
+        return self.__flag
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        with self.__cv:
+            return self.__cv.wait_for(lambda: self.__flag, timeout)
+
+    def take_any(self, timeout: Optional[float] = None) -> tuple[bool, bool]:
+        '''
+        Waits for a poll or a redraw to be asked for; returns and clears both
+        '''
+        with self.__cv:
+            self.__cv.wait_for(lambda: self.__flag or self.__draw, timeout)
+            res, self.__flag, self.__draw = (self.__flag, self.__draw), False, False
+            return res
+
+class PhaseStats(NamedTuple):
+    time: float    # seconds spent in the phase
+    requests: int  # made while in the phase
+
+    @property
+    def per_minute(self) -> float:
+        return self.requests / self.time * 60 if self.time else 0.
+
+class Poller:
+    '''
+    Paces polling loops by client phase. Polling starts at the phase's
+    shortest interval and backs off exponentially to its longest while nothing
+    changes; activity, a wake-up or a phase transition start it over.
+    '''
+
+    def __init__(self, wake: Wake, requests: Callable[[], int], factor: float = 2.):
+        self.__wake, self.__requests, self.__factor = wake, requests, factor
+        self.__phase: Optional[str] = None
+        self.__interval = 0.
+        self.__woke = False
+        self.__t, self.__n = time.monotonic(), requests()
+        self.__stats: dict[Optional[str], PhaseStats] = {}
+
+    def wait(self, phase: Optional[str], active: bool = False, redraw: Optional[Callable[[], Any]] = None):
+        '''
+        Sleeps for the current interval of given phase, or until woken up;
+        active tells that the last poll found something new. Redraws asked
+        for meanwhile are done with redraw, without cutting the sleep short.
+        '''
+        t, n = time.monotonic(), self.__requests()
+        if self.__interval:  # time since the last wait belongs to its phase
+            s = self.__stats.get(self.__phase, PhaseStats(0., 0))
+            self.__stats[self.__phase] = PhaseStats(s.time + t - self.__t, s.requests + n - self.__n)
+        lo, hi = intervals.get(phase, intervals[None])
+        if active or self.__woke or phase != self.__phase or not self.__interval:
+            self.__interval = lo
+        else:
+            self.__interval = min(self.__interval * self.__factor, hi)
+        self.__phase = phase
+        end = time.monotonic() + self.__interval
+        while True:
+            poll, draw = self.__wake.take_any(max(end - time.monotonic(), 0.))
+            if draw and redraw:
+                redraw()
+            if poll or not draw or time.monotonic() >= end:
+                break
+        self.__woke = poll
+        self.__t, self.__n = t, n
+
+    @property
+    def interval(self) -> float:
+        return self.__interval
+
+    @property
+    def stats(self) -> dict[Optional[str], PhaseStats]:
+        return dict(self.__stats)
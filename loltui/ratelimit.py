@@ -0,0 +1,71 @@
+import threading
+import time
+from typing import NamedTuple
+
+#
+# Request scheduling
+#
+
+INTERACTIVE, BACKGROUND = 0, 1  # request priorities, lower is served first
+
+class SchedStats(NamedTuple):
+    queued: int     # requests that waited for a token or a higher priority
+    throttled: int  # requests that waited out a 429 pause
+    retried: int    # requests re-sent after a 429
+
+class Scheduler:
+    '''
+    Token bucket shared by all threads. Waiting requests are served in order
+    of priority, and a 429 response pauses every thread until it's over.
+    '''
+
+    def __init__(self, rate: float, burst: int):
+        self.__cv = threading.Condition()
+        self.__rate, self.__burst = rate, burst
+        self.__tokens, self.__t = float(burst), time.monotonic()
+        self.__until = 0.  # paused until
+        self.__waiting = [0, 0]
+        self.__stats = [0, 0, 0]
+
+    def acquire(self, prio: int = INTERACTIVE):
+        '''
+        Blocks until a request of given priority may be sent
+        '''
+        with self.__cv:
+            self.__waiting[prio] += 1
+            queued = throttled = False
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.__tokens = min(
+                        self.__burst, self.__tokens + (now - self.__t) * self.__rate)
+                    self.__t = now
+                    if now < self.__until:
+                        throttled = True
+                    elif self.__tokens >= 1 and not any(self.__waiting[:prio]):
+                        self.__tokens -= 1
+                        return
+                    else:
+                        queued = True
+                    delay = max(self.__until - now,
+                                (1 - self.__tokens) / self.__rate)
+                    self.__cv.wait(delay if delay > 0 else None)
+            finally:
+                self.__waiting[prio] -= 1
+                self.__stats[0] += queued
+                self.__stats[1] += throttled
+                self.__cv.notify_all()
+
+    def throttle(self, retry_after: float):
+        '''
+        Pauses all requests for given amount of seconds; call before retrying
+        '''
+        with self.__cv:
+            self.__until = max(self.__until, time.monotonic() + retry_after)
+            self.__stats[2] += 1
+            self.__cv.notify_all()
+
+    @property
+    def stats(self) -> SchedStats:
+        with self.__cv:
+            return SchedStats(*self.__stats)
@@ -0,0 +1,123 @@
+import bisect
+import datetime
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+#
+# Record and replay of client traffic
+#
+
+_LIVE_PORT = 2999
+
+class Exchange(NamedTuple):
+    t: float        # seconds since the first recorded request was sent
+    method: str
+    path: str       # path and query, without scheme and host
+    body: Optional[str]
+    status: int
+    headers: dict
+    content: str    # decoded with surrogateescape, so arbitrary bytes survive
+    elapsed: float  # seconds until the response arrived
+
+def _key(method: str, url: str, body) -> tuple[str, str, Optional[str]]:
+    u = urlsplit(url)
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', 'surrogateescape')
+    return method, f'{u.path.lstrip("/")}{"?" if u.query else ""}{u.query}', body
+
+class Recorder:
+    '''
+    Appends every exchange of the sessions it's attached to into a gzipped
+    file of JSON lines
+    '''
+
+    def __init__(self, path: str):
+        self.__lk = threading.Lock()
+        self.__f = gzip.open(path, 'wt', encoding='utf-8')
+        self.__t0: Optional[float] = None
+
+    def attach(self, s: requests.Session):
+        s.hooks['response'].append(self.__record)
+
+    def __record(self, res: requests.Response, *args, **kwargs):
+        sent = time.perf_counter() - (el := res.elapsed.total_seconds())
+        with self.__lk:
+            if self.__f.closed:
+                return
+            if self.__t0 is None:
+                self.__t0 = sent
+            ex = Exchange(round(sent - self.__t0, 4), *_key(res.request.method, res.url, res.request.body),
+                          res.status_code, dict(res.headers),
+                          res.content.decode('utf-8', 'surrogateescape'), round(el, 4))
+            self.__f.write(f'{json.dumps(ex, separators=(",", ":"))}\n')
+
+    def close(self):
+        with self.__lk:
+            self.__f.close()
+
+def load(path: str) -> list[Exchange]:
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return [Exchange(*json.loads(ln)) for ln in f if ln.strip()]
+
+class Replayer(BaseAdapter):
+    '''
+    Serves recorded exchanges in place of the client. With realtime, a request
+    gets the latest response recorded by then (counting from the first replayed
+    request) after the recorded latency; otherwise responses to the same
+    request are served in recorded order without delay, the last one repeating.
+    Unrecorded requests get a 404, or a connection error from the live client
+    as if no game were running.
+    '''
+
+    def __init__(self, exchanges: list[Exchange], realtime: bool = True):
+        super().__init__()
+        self.__ex: dict[tuple, list[Exchange]] = defaultdict(list)
+        for ex in sorted(exchanges, key=lambda x: x.t):
+            self.__ex[ex.method, ex.path, ex.body].append(ex)
+        self.__ts = {k: [x.t for x in v] for k, v in self.__ex.items()}
+        self.__realtime = realtime
+        self.__lk = threading.Lock()
+        self.__next: dict[tuple, int] = defaultdict(int)
+        self.__t0: Optional[float] = None
+
+    def __pick(self, key: tuple) -> Optional[Exchange]:
+        if not (exs := self.__ex.get(key)):
+            return None
+        with self.__lk:
+            if self.__t0 is None:
+                self.__t0 = time.perf_counter()
+            if self.__realtime:
+                i = bisect.bisect_right(self.__ts[key], time.perf_counter() - self.__t0)
+                return exs[max(i - 1, 0)]
+            i = self.__next[key]
+            self.__next[key] = min(i + 1, len(exs) - 1)
+            return exs[i]
+
+    def send(self, request, **kwargs):
+        if (ex := self.__pick(_key(request.method, request.url, request.body))) is None:
+            if urlsplit(request.url).port == _LIVE_PORT:
+                raise requests.ConnectionError(f'no recording of {request.url}', request=request)
+            ex = Exchange(0, request.method, '', None, 404, {'Content-Type': 'application/json'},
+                          '{"errorCode":"RPC_ERROR","httpStatus":404,"message":"not recorded"}', 0)
+        if self.__realtime:
+            time.sleep(ex.elapsed)
+        res = requests.Response()
+        res.status_code, res.url, res.request = ex.status, request.url, request
+        res.headers = CaseInsensitiveDict(ex.headers)
+        res.encoding = get_encoding_from_headers(res.headers)
+        res._content = ex.content.encode('utf-8', 'surrogateescape')
+        res.elapsed = datetime.timedelta(seconds=ex.elapsed)
+        return res
+
+    def close(self):
+        pass
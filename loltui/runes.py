@@ -1,40 +1,124 @@
+import asyncio
+import codecs
 import json
 import re
+import threading
+import time
+from collections import deque
+from contextlib import suppress
 from itertools import chain, groupby
 from operator import itemgetter
-from typing import Union
+from typing import Iterable, Iterator, NamedTuple, Optional, Union
 
 import requests
 
+from loltui import cache
+from loltui.cache import lazy
 from loltui.client import client
+from loltui.metrics import EndpointStats, Metrics
 from loltui.output import *
 
 _headers = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/50.0.2661.102 Safari/537.36'}
 
-_prunetbl = re.compile(r'<div class="perk-page__row">([\s\S]+?)</td>')
+_tblbeg, _tblend = '<div class="perk-page__row">', '</td>'
 _prune = re.compile(r'perk(Shard)?\/([0-9]+)\.png\?image=q_auto')
 
-_2style = [[(perk, style['id']) for slot in style['slots'] for perk in slot['perks']]
-           for style in client.get_json('lol-perks/v1/styles')]
-_commonperks = set(map(itemgetter(0), _2style[0])).intersection(
-    map(itemgetter(0), _2style[1]))
-_2style = dict(filter(
-    lambda x: x[0] not in _commonperks, chain.from_iterable(_2style)))
-_2name = {perk['id']: perk['name']
-          for perk in client.get_json('lol-perks/v1/perks')}
+def _perkdata(endpoint: str, name: str) -> list[dict]:
+    return cache.memo_json(name, client().version, lambda: client().get_json(endpoint))
+
+@lazy
+def _2style() -> dict[int, int]:
+    '''
+    Maps perks to their styles; perks common to all styles are left out
+    '''
+    ps = [[(perk, style['id']) for slot in style['slots'] for perk in slot['perks']]
+          for style in _perkdata('lol-perks/v1/styles', 'perk-styles.json')]
+    common = set(map(itemgetter(0), ps[0])).intersection(map(itemgetter(0), ps[1]))
+    return dict(filter(lambda x: x[0] not in common, chain.from_iterable(ps)))
+
+@lazy
+def _2name() -> dict[int, str]:
+    return {perk['id']: perk['name'] for perk in _perkdata('lol-perks/v1/perks', 'perks.json')}
 
 _cperk = {8000: 214, 8100: 9, 8200: 177, 8400: 154, 8300: 75, None: 251}
 
-def get_runes(champ: str, role: str) -> Union[list[int], str]:
+class Scrape(NamedTuple):
+    champ: str
+    role: str
+    wire_bytes: int  # bytes received, before content decoding
+    peak_buf: int    # max characters held for parsing
+    elapsed: float   # seconds until the rune table was read
+    early: bool      # whether the response was abandoned after the table
+
+scrapes: deque[Scrape] = deque(maxlen=64)  # most recent scrapes
+_metrics = Metrics()
+_tpl = 'op.gg/champion/{champ}/statistics/{role}/rune'
+
+def scrape_stats() -> dict[str, EndpointStats]:
+    return _metrics.snapshot()
+
+_opgg = requests.Session()  # scrapes that stop early close their connection rather than drain it
+
+def _decoded(chunks: Iterable[bytes]) -> Iterator[str]:
+    '''
+    Decodes UTF-8 chunks, including characters split between them
+    '''
+    dec = codecs.getincrementaldecoder('U8')()
+    for chunk in chunks:
+        yield dec.decode(chunk)
+    yield dec.decode(b'', True)
+
+def _find_table(chunks) -> tuple[Optional[str], int]:
+    '''
+    Returns contents of the first rune table in decoded chunks, reading no
+    further than its end, and the peak amount of characters buffered
+    '''
+    text, peak, beg = '', 0, -1
+    for chunk in chunks:
+        scanned = len(text)
+        text += chunk
+        peak = max(peak, len(text))
+        if beg == -1:
+            if (beg := text.find(_tblbeg, max(0, scanned - len(_tblbeg)))) == -1:
+                text = text[-len(_tblbeg):]  # nothing before the table matters
+                continue
+            scanned = beg
+        if (end := text.find(_tblend, max(beg, scanned - len(_tblend)))) != -1:
+            return text[beg + len(_tblbeg):end], peak
+    return None, peak
+
+def get_runes(champ: str, role: str, cancel: Optional[threading.Event] = None) -> Optional[Union[list[int], str]]:
+    '''
+    Scrapes runes from op.gg; returns None if cancel got set midway
+    '''
+    t, done = time.perf_counter(), False
+    def chunks():
+        nonlocal done
+        for chunk in resp.iter_content(1 << 14):
+            if cancel and cancel.is_set():
+                raise InterruptedError
+            yield chunk
+        done = True
     try:
-        resp = requests.get(
-            f'https://www.op.gg/champion/{champ}/statistics/{role}/rune',
-            headers=_headers)
+        with _opgg.get(f'https://www.op.gg/champion/{champ}/statistics/{role}/rune',
+                       headers=_headers, stream=True) as resp:
+            try:
+                tbl, peak = _find_table(_decoded(chunks()))
+            except InterruptedError:
+                return None
+            except UnicodeDecodeError as e:
+                return f'Error reading runes: {cyell(e)}'
+            scrapes.append(s := Scrape(champ, role, resp.raw.tell(), peak,
+                                       time.perf_counter() - t, not done))
+            _metrics.record(_tpl, s.elapsed, s.wire_bytes, resp.status_code)
     except Exception as e:
+        if isinstance(e, requests.ConnectionError):
+            _metrics.record(_tpl, time.perf_counter() - t, 0, 0)
         return f'Error querying for runes: {cyell(e)}'
+    if tbl is None:
+        return f'Error reading runes: {cyell("no rune table")}'
     try:
-        tbl = _prunetbl.search(resp.content.decode('U8'))[1]
         res = [int(m[2]) for m in _prune.finditer(tbl)]
         if len(res) == 9:
             return res
@@ -42,31 +126,108 @@ def get_runes(champ: str, role: str) -> Union[list[int], str]:
         return f'Error reading runes: {cyell(e)}'
     return f'Error reading runes: {cyell("unexpected layout")}'
 
+async def aget_runes(champ: str, role: str) -> Optional[Union[list[int], str]]:
+    '''
+    Awaitable get_runes; cancelling the awaiting task stops the scrape midway
+    '''
+    cancel = threading.Event()
+    try:
+        return await asyncio.to_thread(get_runes, champ, role, cancel)
+    except asyncio.CancelledError:
+        cancel.set()
+        raise
+
+#
+# Rune page writing
+#
+
+class _PageWriter:
+    '''
+    Writes the managed rune page on a background thread. Writes submitted
+    within delay seconds of each other are coalesced into the latest one.
+    '''
+
+    def __init__(self, delay: float):
+        self.__cv = threading.Condition()
+        self.__delay = delay
+        self.__pending: Optional[tuple[str, list[int], float]] = None
+        self.__page: Optional[int] = None  # id of the managed page
+        self.__err: Optional[str] = None
+        self.__thread: Optional[threading.Thread] = None
+
+    def submit(self, name: str, runes: list[int]):
+        with self.__cv:
+            self.__pending = name, runes, time.monotonic() + self.__delay
+            if not self.__thread:
+                self.__thread = threading.Thread(target=self.__run, daemon=True)
+                self.__thread.start()
+            self.__cv.notify()
+
+    def pop_error(self) -> Optional[str]:
+        with self.__cv:
+            err, self.__err = self.__err, None
+            return err
+
+    def __run(self):
+        while True:
+            with self.__cv:
+                while not self.__pending or (t := self.__pending[2] - time.monotonic()) > 0:
+                    self.__cv.wait(t if self.__pending else None)
+                name, runes, _ = self.__pending
+                self.__pending = None
+            try:
+                err = self.__write(name, runes)
+            except Exception as e:  # the writer must outlive a failed write
+                err = f'Failed to set runes: {cyell(e)}'
+            with self.__cv:
+                self.__err = err
+            if err:
+                client().wake.redraw()
+
+    def __write(self, name: str, runes: list[int]) -> Optional[str]:
+        data = {
+            'current': True,
+            'name': f'lt: {name}',
+            'primaryStyleId': _2style()[runes[0]],
+            'selectedPerkIds': runes,
+            'subStyleId': _2style()[runes[4]]}
+        if self.__page is None:
+            page = next((x for x in client().get_json('lol-perks/v1/pages')
+                         if x['name'].startswith('lt: ')), None)
+            self.__page = page and page['id']
+        if self.__page is not None:
+            resp = client().put(f'lol-perks/v1/pages/{self.__page}',
+                              data=json.dumps(data | {'id': self.__page}))
+            if resp.status_code == 404:  # page got deleted by the user
+                self.__page = None
+                return self.__write(name, runes)
+        elif (resp := client().post('lol-perks/v1/pages', data=json.dumps(data))).ok:
+            self.__page = resp.json()['id']
+        if resp.status_code // 100 != 2:
+            msg = f'code {resp.status_code}'
+            with suppress(ValueError, AttributeError):  # error bodies aren't always JSON objects
+                msg = resp.json().get('message', msg)
+            return f'Failed to set runes: {cyell(msg)}'
+
+_writer = _PageWriter(.3)
+
 def apply_runes(name: str, runes: Union[list[int], str]) -> list[str]:
+    '''
+    Queues given runes to be written to the client; returns their presentation
+    '''
     # Return error message
     if isinstance(runes, str):
         return [runes]
 
-    # Build runepage
-    s0 = _2style[runes[0]]
-    data = {
-        'current': True,
-        'name': f'lt: {name}',
-        'primaryStyleId': s0,
-        'selectedPerkIds': runes,
-        'subStyleId': _2style[runes[4]]}
-
     # Submit to client
-    if page := next((x for x in client.get_json('lol-perks/v1/pages')
-                     if x['name'].startswith('lt: ')), None):
-        data = json.dumps(data | {'id': page['id']})
-        resp = client.put(f'lol-perks/v1/pages/{page["id"]}', data=data)
-    else:
-        resp = client.post('lol-perks/v1/pages', data=json.dumps(data))
-    if resp.status_code // 100 != 2:
-        msg = resp.json().get("message", f"code {resp.status_code}")
-        return [f'Failed to set runes: {cyell(msg)}']
+    _writer.submit(name, runes)
 
     # Return string representation
-    return [f'{f"{CSI}38;5;{C_GRAY}m, ".join(f"{CSI}38;5;{k}m{_2name[r]}" for r in rs)}{CSI}m' for k, rs in groupby(
-        runes, lambda x: _cperk[_2style.get(x)])]
+    return [f'{f"{CSI}38;5;{C_GRAY}m, ".join(f"{CSI}38;5;{k}m{_2name()[r]}" for r in rs)}{CSI}m' for k, rs in groupby(
+        runes, lambda x: _cperk[_2style().get(x)])]
+
+def rune_write_error() -> Optional[str]:
+    '''
+    Returns the error of the latest failed rune page write, once
+    '''
+    return _writer.pop_error()
@@ -1,45 +1,75 @@
+import atexit
 import threading
-import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from itertools import chain
 from operator import itemgetter
 from threading import Event
 from typing import Callable, Iterable, Optional, Union
 
+from loltui import cache
+from loltui.cache import TTLCache, lazy
 from loltui.client import client, qdata
+from loltui.live import LivePanel
 from loltui.output import *
 from loltui.playerinfo import PlayerInfo
-from loltui.runes import apply_runes, get_runes
+from loltui.runes import apply_runes, get_runes, rune_write_error
 
 #
 # Rune retrieval
 #
 
 _lk = threading.Lock()
-_runes = dict()
-_rune_work = set()
+_rune_work: dict[tuple[int, int], tuple[Future, Event]] = {}
+_rune_pool = ThreadPoolExecutor(3)
+_rune_ttl, _rune_err_ttl = 24 * 3600, 60  # seconds to keep runes, or errors
+
+@lazy
+def _runes() -> TTLCache:
+    '''
+    Rune cache, persisted across runs
+    '''
+    c, v = TTLCache(256), client().version
+    for (cid, role), t, val in cache.load('runes.json', v) or ():
+        c.put((cid, role), val, t)
+    atexit.register(lambda: cache.save('runes.json', v, [
+        (k, t, x) for k, t, x in c.items() if isinstance(x, list)]))
+    return c
 
 _roles = ['Top', 'Jungle', 'Middle', 'Support', 'ADC']
-def _rune_fetch():
-    while True:
-        cid, role = next(iter(_rune_work))
-        cname = client.champions[cid]['name']
-        val = get_runes(cname, _roles[role].lower())
+def _rune_fetch(key: tuple[int, int], cancel: Event):
+    cid, role = key
+    try:
+        val = get_runes(client().champions[cid]['name'], _roles[role].lower(), cancel)
+    except Exception as e:  # else it would be retried on every poll
+        val = f'Error querying for runes: {cyell(e)}'
+    finally:
         with _lk:
-            _runes[(cid, role)] = val
-            _rune_work.remove((cid, role))
-            if not _rune_work:
-                _poll.clear()
-                return
+            del _rune_work[key]
+    if val is not None:
+        _runes().set(key, val, _rune_ttl if isinstance(val, list) else _rune_err_ttl)
+        client().wake.redraw()
 
 def _get_rune(key) -> Optional[Union[list[int], str]]:
+    if (val := _runes().get(key)) is not None:
+        return list(val) if isinstance(val, list) else val
+    with _lk:
+        if key not in _rune_work:
+            cancel = Event()
+            _rune_work[key] = _rune_pool.submit(_rune_fetch, key, cancel), cancel
+
+def _prefetch_runes(cid: int, role: Optional[int]):
+    '''
+    Queues fetching runes of all roles for given champ, given role first.
+    Fetches for other champs are cancelled.
+    '''
     with _lk:
-        if val := _runes.get(key):
-            return val
-        elif key not in _rune_work:
-            empty = not _rune_work
-            _rune_work.add(key)
-            if empty:
-                threading.Thread(target=_rune_fetch).start()
+        for key in [k for k in _rune_work if k[0] != cid]:
+            fut, cancel = _rune_work[key]
+            cancel.set()
+            if fut.cancel():
+                del _rune_work[key]
+    for r in sorted(range(len(_roles)), key=lambda r: r != role):
+        _get_rune((cid, r))
 
 #
 # Session tab-keeper
@@ -52,9 +82,12 @@ def _buts() -> str:
     return f'\033[38;5;79m▏RUNES: {" ".join(f"{cbut(r[0])}{r[1:]}" if i != _role else f"{CSI}38;5;79m{r}{CSI}0m" for i, r in enumerate(_roles))}{cycle}'
 class Session:
     def __init__(self, q: str, geom: tuple[int, int], sids: Iterable[int], cids_getter: Callable[[
-    ], Optional[list[int]]], *, cc_getter: Optional[Callable[[list[int]], int]] = None):
+    ], Optional[list[int]]], *, cc_getter: Optional[Callable[[list[int]], int]] = None,
+                 phase: Optional[str] = None, live: Optional[LivePanel] = None):
         self.__q = q
+        self.__phase = phase  # client phase, for pacing the polling
         self.__pi = PlayerInfo(geom, sids, self.__present)
+        self.__live = live  # shown below the player info
         self.__ccg = cc_getter
         self.__cg = cids_getter
 
@@ -62,16 +95,25 @@ class Session:
         '''
         Constructs and presents champ select box to the user
         '''
-        box(*self.__pi.get(), post=self.__pi.post, title=self.__q)
+        rows = [*self.__pi.get()]
+        self.__pi.clear()
+        box(*rows, title=self.__q)
 
-    def loop(self, interval: float):
+    def loop(self):
         #
         # Show player info only
         #
         if not self.__ccg:
+            def show(cids: list[int]) -> bool:
+                with frame():
+                    changed = self.__pi.update(cids)
+                    if self.__live:  # its changes get drawn on redraw requests, not polls
+                        self.__live.update(changed)
+                return changed
             while cids := self.__cg():
-                self.__pi.update(cids)
-                time.sleep(interval)
+                client().wait(self.__phase, show(cids), lambda: show(cids))
+            if self.__live:
+                self.__live.close()
             self.__pi.clear()
             return
 
@@ -95,55 +137,71 @@ class Session:
             else:
                 _role = i if _role != i else None
                 _poll.set()
+            client().wake.redraw()
         buts = button(_runemsg[0], cb)
 
-        while cids := self.__cg():
-            # Update presented summoner info
-            if self.__pi.update(cids):
-                _update = True
-
-            # When there are no runes to show (yet?)
-            def norunes():
-                global _role, _prev_role, _update, _runemsg
-                if _poll.is_set():
-                    _poll.clear()
-                    _prev_role = _role
-                    if not _update:
-                        out_rm(len(_runemsg))
-                    _runemsg = [_buts()]
-                    out(_runemsg)
-                    _update = False
-                elif _update:
-                    _update = False
-                    out(_runemsg)
+        def show(cids: list[int]) -> bool:
+            global _update, _prev_cc, _prev_role, _runemsg
+            with frame():  # changes are flushed at once
+                # Update presented summoner info
+                if changed := self.__pi.update(cids):
+                    _update = True
 
-            # Update runes
-            if _role and (cc := self.__ccg(cids)):
-                if _prev_cc == cc and _prev_role == _role:
-                    _poll.clear()
-                    if _update:
+                # When there are no runes to show (yet?)
+                def norunes():
+                    global _role, _prev_role, _update, _runemsg
+                    if _poll.is_set():
+                        _poll.clear()
+                        _prev_role = _role
+                        if not _update:
+                            out_rm(len(_runemsg))
+                        _runemsg = [_buts()]
                         out(_runemsg)
                         _update = False
-                elif runes := _get_rune((cc, _role)):
-                    runes[-1] = _deffrag_id[_deffrag]
-                    _poll.clear()
-                    _prev_cc = cc
-                    _prev_role = _role
-                    runename = f'{client.champions[cc]["name"]} {_roles[_role]} +{"".join(filter(str.isupper, _deffrag_str[_deffrag]))}'
+                    elif _update:
+                        _update = False
+                        out(_runemsg)
+
+                # Update runes; all roles of the hovered champ are fetched ahead
+                if cc := self.__ccg(cids):
+                    _prefetch_runes(cc, _role)
+                if _role and cc:
+                    if _prev_cc == cc and _prev_role == _role:
+                        _poll.clear()
+                        if _update:
+                            out(_runemsg)
+                            _update = False
+                    elif runes := _get_rune((cc, _role)):
+                        runes[-1] = _deffrag_id[_deffrag]
+                        _poll.clear()
+                        _prev_cc = cc
+                        _prev_role = _role
+                        runename = f'{client().champions[cc]["name"]} {_roles[_role]} +{"".join(filter(str.isupper, _deffrag_str[_deffrag]))}'
+                        rmlen = len(_runemsg)
+                        _runemsg = [
+                            _buts(), *map(lambda x:f'\033[38;5;79m▏ {x}', apply_runes(runename, runes))]
+                        if not _update:
+                            out_rm(rmlen)
+                        out(_runemsg)
+                        _update = False
+                    else:
+                        norunes()
+                else:
+                    norunes()
+
+                # Report a failed rune page write
+                if err := rune_write_error():
                     rmlen = len(_runemsg)
-                    _runemsg = [
-                        _buts(), *map(lambda x:f'\033[38;5;79m▏ {x}', apply_runes(runename, runes))]
+                    _runemsg = [_buts(), f'\033[38;5;79m▏ {err}']
                     if not _update:
                         out_rm(rmlen)
                     out(_runemsg)
                     _update = False
-                else:
-                    norunes()
-            else:
-                norunes()
+            return changed
 
+        while cids := self.__cg():
             # Periodical polling for champs
-            _poll.wait(interval)
+            client().wait(self.__phase, show(cids), lambda: show(cids))
 
         button_unsub(buts)
         self.__pi.clear()
@@ -154,28 +212,29 @@ class Session:
 #
 
 def _get_gd_q() -> tuple[dict, str]:
-    gd = client.get_json('lol-gameflow/v1/session')['gameData']
-    return gd, qdata[qid]['description'].removesuffix(' games') if (
+    gd = client().get_json('lol-gameflow/v1/session')['gameData']
+    return gd, qdata()[qid]['description'].removesuffix(' games') if (
         qid := gd['queue']['id']) != -1 else 'Custom'
 
 def _ingame() -> bool:
-    return client.get(
-        'lol-gameflow/v1/gameflow-phase').content == b'"InProgress"'
-_champ2id = {v['name']: k for k, v in client.champions.items()}
+    return client().get_json('lol-gameflow/v1/gameflow-phase') == 'InProgress'
+@lazy
+def _champ2id() -> dict[str, int]:
+    return {v['name']: k for k, v in client().champions.items()}
 def _get_ingame_session() -> Optional[Session]:
     '''
     In-game: info given on all players
     '''
-    if _ingame() and (d := client.game('liveclientdata/allgamedata')):
+    if _ingame() and (d := client().game('liveclientdata/allgamedata')):
         d = {x['summonerName']: x['championName'] for x in d['allPlayers']}
         gd, q = _get_gd_q()
         ps = [[y for y in x if 'summonerId' in y]
               for x in (gd['teamOne'], gd['teamTwo'])]
         g = list(map(len, ps))
         ps = list(chain.from_iterable(ps))
-        cids = [_champ2id[d[x['summonerName']]] for x in ps]
+        cids = [_champ2id()[d[x['summonerName']]] for x in ps]
         return Session(q, g, [int(x['summonerId'])
-                              for x in ps], lambda: _ingame() and cids)
+                              for x in ps], lambda: _ingame() and cids, phase='InProgress', live=LivePanel())
 
 #
 # Champ-selection session
@@ -187,7 +246,7 @@ def _get_champsel_session() -> Optional[Session]:
     Champ selection: only teammates revealed, rune helper
     '''
     def get_team():
-        if (d := client.get_json(
+        if (d := client().get_json(
                 'lol-champ-select/v1/session')) and 'myTeam' in d:
             return d['myTeam']
     def get_cids() -> Optional[list[int]]:
@@ -196,29 +255,29 @@ def _get_champsel_session() -> Optional[Session]:
     if d := get_team():
         _, q = _get_gd_q()
 
-        cs = client.get_json('lol-summoner/v1/current-summoner')['summonerId']
+        cs = client().get_json('lol-summoner/v1/current-summoner')['summonerId']
         csi = next(i for i, x in enumerate(d) if x['summonerId'] == cs)
         cspos = next(x['assignedPosition'] for x in d if x['summonerId'] == cs)
         global _role
         _role = _pos.index(cspos) if cspos in _pos else None
 
-        return Session(q, (len(d), 0), [x['summonerId']
-                                        for x in d], get_cids, cc_getter=itemgetter(csi))
+        return Session(q, (len(d), 0), [x['summonerId'] for x in d], get_cids,
+                       cc_getter=itemgetter(csi), phase='ChampSelect')
 
 #
 # Session retrieval
 #
 
-def _try_get_ses() -> Optional[Session]:
-    if (gf := client.get('lol-gameflow/v1/gameflow-phase').content) == b'"ChampSelect"':
+def _try_get_ses(gf: str) -> Optional[Session]:
+    if gf == 'ChampSelect':
         return _get_champsel_session()
-    elif gf == b'"InProgress"':
+    elif gf == 'InProgress':
         return _get_ingame_session()
 
-def get_session(interval: float) -> Session:
+def get_session() -> Session:
     '''
     Returns a Session representing either a champ select or in-progress game
     '''
-    while not (ses := _try_get_ses()):
-        time.sleep(interval)
+    while not (ses := _try_get_ses(gf := client().get_json('lol-gameflow/v1/gameflow-phase'))):
+        client().wait(gf)
     return ses
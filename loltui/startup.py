@@ -0,0 +1,36 @@
+import atexit
+import sys
+import time
+
+import psutil
+
+#
+# Startup profiling
+#
+
+_t0 = psutil.Process().create_time()
+_marks: list[tuple[str, float]] = []
+
+def mark(phase: str):
+    '''
+    Records given phase of startup as having ended now, unless it already has
+    '''
+    if all(x != phase for x, _ in _marks):
+        _marks.append((phase, time.time()))
+
+def report() -> str:
+    '''
+    Returns the duration of each recorded phase, starting from process start
+    '''
+    lines, prev = [], _t0
+    for phase, t in _marks:
+        lines.append(f'{phase:<20}{(t - prev) * 1000:9.1f} ms')
+        prev = t
+    lines.append(f'{"total":<20}{(prev - _t0) * 1000:9.1f} ms')
+    return '\n'.join(lines)
+
+def enable():
+    '''
+    Prints the report to stderr at exit
+    '''
+    atexit.register(lambda: sys.stderr.write(f'{report()}\n'))
@@ -0,0 +1,37 @@
+'''
+Micro-benchmark of box() column layout; run with `python -m test.bench_output`
+'''
+import timeit
+
+from loltui.output import Cell, _layout
+
+def _aligned_recursive(l: list[str]):
+    # Previous implementation, one pass per column
+    idx = [x.find('\0') for x in l]
+    if (m := max(idx, default=-1)) == -1:
+        return l
+    for i, j in enumerate(idx):
+        if j != -1:
+            l[i] = f'{l[i][:j]}{" "*(m - j)}{l[i][j+1:]}'
+    return _aligned_recursive(l)
+
+def _table(players: int, champs: int) -> list[str]:
+    # Shaped like PlayerInfo.get() output: two lines per player
+    T = '\0 '
+    names = [f'Champion{i % 7}' * (1 + i % 2) for i in range(champs)]
+    return [ln for i in range(players) for ln in (
+        f'Summoner{i}\tG{i % 4 + 1}→P{i % 4 + 1}{T}│ {T.join(names)}{T}',
+        f'1011{T}│ {T.join(f"{i * 37 % 900}K" for i in range(champs))}{T}')]
+
+def _cells(l: list[str]) -> list[list[list[Cell]]]:
+    return [[[Cell(c)] for c in x.split('\0')] for x in l]
+
+if __name__ == '__main__':
+    for players, champs in ((5, 10), (10, 10), (10, 40), (50, 40)):
+        tbl, rows = _table(players, champs), _cells(_table(players, champs))
+        assert [p for p, _ in _layout(rows)] == _aligned_recursive(list(tbl))
+        n = max(1, 20000 // (players * champs))
+        old, new = (min(timeit.repeat(f, number=n, repeat=5)) / n
+                    for f in (lambda: _aligned_recursive(list(tbl)), lambda: _layout(rows)))
+        print(f'{players:>3} players x {champs:>2} champs: '
+              f'{old * 1e6:8.1f} us -> {new * 1e6:8.1f} us ({old / new:.1f}x)')
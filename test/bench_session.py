@@ -0,0 +1,163 @@
+'''
+End-to-end benchmark of session flows against fake servers; run with
+`python -m test.bench_session [--latency MS] [--throttle P] [--out FILE] [--compare FILE]`
+'''
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Optional
+
+from test.fakes import CHAMPIONS, FakeLCU, FakeOpgg, seed_cache, until
+
+from loltui import output, playerinfo, runes, session
+from loltui.client import client, configure
+from loltui.output import CSI
+
+class _Screen:
+    '''
+    Collects what gets written to the terminal, with perf_counter times
+    '''
+
+    def __init__(self):
+        self.__cv = threading.Condition()
+        self.__writes: list[tuple[float, str]] = []
+
+    def write(self, s: str):
+        with self.__cv:
+            self.__writes.append((time.perf_counter(), s))
+            self.__cv.notify_all()
+
+    def mark(self) -> int:
+        with self.__cv:
+            return len(self.__writes)
+
+    def wait(self, pred: Callable[[str], bool], since: int, timeout: float = 10.) -> float:
+        '''
+        Returns time of the first write since given mark satisfying pred
+        '''
+        end = time.perf_counter() + timeout
+        with self.__cv:
+            while True:
+                for t, s in self.__writes[since:]:
+                    if pred(s):
+                        return t
+                since = len(self.__writes)
+                if not self.__cv.wait(end - time.perf_counter()):
+                    raise TimeoutError
+
+def _hl(cid: int) -> str:
+    # hovered champs are written in the highlight color
+    return f'{CSI}38;5;214m{CHAMPIONS[cid]}'
+
+def _box(s: str) -> bool:
+    # the table is first drawn with placeholders in place of missing names
+    return '…' in s or 'Player' in s
+
+def _session(lcu: FakeLCU, start: Callable[[], None]) -> tuple[threading.Thread, float]:
+    '''
+    Starts the lobby and a thread that runs the session it brings up
+    '''
+    th = threading.Thread(target=lambda: session.get_session().loop(), daemon=True)
+    th.start()
+    t0 = time.perf_counter()
+    start()
+    client().wake.set()
+    return th, t0
+
+def _end(lcu: FakeLCU, th: threading.Thread):
+    lcu.end()
+    client().wake.set()
+    th.join(10)
+
+def champ_select(lcu: FakeLCU, scr: _Screen, sids: list[int], champs: list[int], hovers: int) -> dict:
+    n, m, k = lcu.total, scr.mark(), len(playerinfo.loads)
+    th, t0 = _session(lcu, lambda: lcu.champ_select(sids))
+    box = scr.wait(_box, m) - t0
+    ttfb = scr.wait(lambda s: f'Player{sids[-1]}' in s, m) - t0
+
+    # Teammates hovering champs
+    redraws = []
+    for i, cid in zip(range(hovers), champs):
+        m, t = scr.mark(), time.perf_counter()
+        lcu.hover(1 + i % (len(sids) - 1), cid)
+        client().wake.set()
+        redraws.append(scr.wait(lambda s: _hl(cid) in s, m) - t)
+
+    # Hovering own champ brings up runes of the assigned role
+    w, m, t = len(lcu.writes), scr.mark(), time.perf_counter()
+    lcu.hover(0, cid := champs[-1])
+    client().wake.set()
+    shown = scr.wait(lambda s: 'Perk' in s, m) - t
+    until(lambda: len(lcu.writes) > w, 10)
+    applied = time.perf_counter() - t
+    until(lambda: len(playerinfo.loads) > k, 10)
+
+    _end(lcu, th)
+    return {'first_box': box, 'ttfb': ttfb, 'players_loaded': playerinfo.loads[-1].loaded,
+            'hover_redraw': statistics.median(redraws), 'rune_shown': shown, 'rune_applied': applied,
+            'requests': lcu.total - n, 'player_requests': playerinfo.loads[-1].requests}
+
+def in_game(lcu: FakeLCU, scr: _Screen, sids: list[int], champs: list[int]) -> dict:
+    n, m, k = lcu.total, scr.mark(), len(playerinfo.loads)
+    th, t0 = _session(lcu, lambda: lcu.in_game([sids[:5], sids[5:]], champs))
+    box = scr.wait(_box, m) - t0
+    ttfb = scr.wait(lambda s: f'Player{sids[-1]}' in s, m) - t0
+    until(lambda: len(playerinfo.loads) > k, 10)
+    _end(lcu, th)
+    return {'first_box': box, 'ttfb': ttfb, 'players_loaded': playerinfo.loads[-1].loaded,
+            'requests': lcu.total - n, 'player_requests': playerinfo.loads[-1].requests}
+
+def run(latency: float, throttle: float, runs: int) -> dict[str, dict[str, float]]:
+    '''
+    Returns the median of each metric per scenario; each run uses its own
+    players and champs, so cold runs miss every cache
+    '''
+    seed_cache(tempfile.mkdtemp())
+    lcu = FakeLCU(latency=latency, throttle=throttle)
+    runes._opgg.mount('https://www.op.gg', FakeOpgg(latency=latency))
+    session.button = lambda msg, cb: []  # no hotkeys here
+    session.button_unsub = lambda subs: None
+    configure(adapter=lcu)
+    client()
+    output._w = (scr := _Screen()).write
+
+    res: dict[str, list[dict]] = {}
+    for r in range(runs):
+        sids, champs = [100 * r + i for i in range(1, 11)], [1 + (17 * r + 5 * i) % 160 for i in range(10)]
+        res.setdefault('champ_select_cold', []).append(champ_select(lcu, scr, sids[:5], champs, 4))
+        res.setdefault('champ_select_warm', []).append(champ_select(lcu, scr, sids[:5], champs[::-1], 4))
+        res.setdefault('in_game', []).append(in_game(lcu, scr, sids, champs))
+    return {k: {m: statistics.median(x[m] for x in v) for m in v[0]} for k, v in res.items()}
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--latency', type=float, default=20, metavar='MS', help='added to each response')
+    ap.add_argument('--throttle', type=float, default=0, metavar='P', help='fraction of LCU requests getting 429')
+    ap.add_argument('--runs', type=int, default=3)
+    ap.add_argument('--out', metavar='FILE', help='write results as JSON')
+    ap.add_argument('--compare', metavar='FILE', help='results to compare against')
+    args = ap.parse_args()
+
+    res = {'commit': _commit(), 'latency': args.latency, 'throttle': args.throttle,
+           'results': run(args.latency / 1000, args.throttle, args.runs)}
+    old = json.load(open(args.compare))['results'] if args.compare else {}
+    for k, ms in res['results'].items():
+        for m, v in ms.items():
+            fmt = (lambda x: f'{x:8.0f}') if m.endswith('requests') else (lambda x: f'{x * 1000:6.1f}ms')
+            was = f'  (was {fmt(o)})' if (o := old.get(k, {}).get(m)) is not None else ''
+            sys.stderr.write(f'{k:<18} {m:<16}{fmt(v)}{was}\n')
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(res, f, indent=2)
@@ -0,0 +1,33 @@
+import pytest
+
+from test.fakes import FakeLCU, seed_cache
+
+from loltui import cache, playerinfo, runes, session
+from loltui.cache import TTLCache
+from loltui.client import client, configure
+
+@pytest.fixture(scope='module')
+def lcu(tmp_path_factory):
+    '''
+    Fake client shared by a module's tests, with static data cached in a
+    directory of its own; state built from other modules' fakes is dropped
+    '''
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(cache, 'cache_dir', cache.cache_dir)  # restored after the module
+        seed_cache(str(tmp_path_factory.mktemp('cache')))
+        configure(reset=True, adapter=(lcu := FakeLCU()))
+        for f in (runes._2style, runes._2name, session._runes, session._champ2id, playerinfo._matches):
+            f.reset()
+        client()
+        yield lcu
+
+@pytest.fixture
+def fresh(lcu, monkeypatch):
+    '''
+    The fake client with no requests counted and no player data cached
+    '''
+    monkeypatch.setattr(playerinfo, '_pcache', TTLCache(256))
+    monkeypatch.setattr(playerinfo, '_batch', True)
+    lcu.requests.clear()
+    yield lcu
+    lcu.batch = True
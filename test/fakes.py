@@ -0,0 +1,355 @@
+import abc
+import base64
+import datetime
+import hashlib
+import io
+import json
+import random
+import re
+import socketserver
+import struct
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from loltui import cache
+from loltui.metrics import template
+
+#
+# Stand-in for the LCU WebSocket
+#
+
+_WS_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+def _frame(payload: bytes, opcode: int = 1) -> bytes:
+    n = len(payload)
+    hdr = bytes([0x80 | opcode, n]) if n < 126 else struct.pack(
+        '!BBH', 0x80 | opcode, 126, n) if n < 1 << 16 else struct.pack('!BBQ', 0x80 | opcode, 127, n)
+    return hdr + payload
+
+class FakeEventServer:
+    '''
+    Accepts WebSocket connections, records WAMP subscriptions, and pushes
+    OnJsonApiEvent messages to subscribers
+    '''
+
+    def __init__(self):
+        srv = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                hdrs = {}
+                while (ln := self.rfile.readline().strip()):
+                    if b':' in ln:
+                        k, v = ln.split(b':', 1)
+                        hdrs[k.strip().lower()] = v.strip()
+                srv.headers = hdrs
+                acc = base64.b64encode(hashlib.sha1(
+                    hdrs[b'sec-websocket-key'] + _WS_GUID).digest())
+                self.wfile.write(b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n'
+                                 b'Connection: Upgrade\r\nSec-WebSocket-Accept: ' + acc + b'\r\n\r\n')
+                with srv.lk:
+                    srv.conns.append(self.wfile)
+                while (msg := self.__read()) is not None:
+                    if (m := json.loads(msg))[0] == 5:
+                        with srv.lk:
+                            srv.subscribed.add(m[1])
+                with srv.lk:
+                    srv.conns.remove(self.wfile)
+
+            def __read(self):
+                if len(b := self.rfile.read(2)) < 2 or b[0] & 0xf == 8:
+                    return None
+                n = b[1] & 0x7f
+                if n >= 126:
+                    n, = struct.unpack('!H' if n == 126 else '!Q',
+                                       self.rfile.read(2 if n == 126 else 8))
+                mask = self.rfile.read(4)
+                return bytes(x ^ mask[i % 4] for i, x in enumerate(self.rfile.read(n))).decode()
+
+        self.lk = threading.Lock()
+        self.conns = []
+        self.headers = {}
+        self.subscribed: set[str] = set()
+        self.__srv = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self.__srv.daemon_threads = True
+        threading.Thread(target=self.__srv.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f'ws://127.0.0.1:{self.__srv.server_address[1]}/'
+
+    def push(self, endpoint: str, data, event_type: str = 'Update'):
+        ev = f'OnJsonApiEvent_{endpoint.replace("/", "_")}'
+        with self.lk:
+            if ev not in self.subscribed:
+                return
+        self.send(json.dumps([8, ev, {'data': data, 'eventType': event_type, 'uri': f'/{endpoint}'}]))
+
+    def send(self, msg: str):
+        '''
+        Sends given text to every connection as is
+        '''
+        with self.lk:
+            for c in self.conns:
+                c.write(_frame(msg.encode()))
+
+    def drop(self):
+        '''
+        Closes every connection, as if the client went away
+        '''
+        with self.lk:
+            for c in self.conns:
+                c.write(_frame(b'', 8))
+            self.subscribed.clear()
+
+    def close(self):
+        self.drop()
+        self.__srv.shutdown()
+        self.__srv.server_close()
+
+#
+# Stand-ins for the LCU, the live client, and op.gg
+#
+
+VERSION = '13.1.1'
+CHAMPIONS = {i: f'Champion{i:03}' for i in range(1, 161)}
+STYLES = [8000, 8100, 8200, 8300, 8400]
+_SHARDS = [[5008, 5005, 5007], [5008, 5002, 5003], [5001, 5002, 5003]]
+
+def until(pred: Callable[[], Any], timeout: float = 2.) -> Any:
+    '''
+    Returns the first truthy value of pred, polling it for up to timeout seconds
+    '''
+    end = time.monotonic() + timeout
+    while not (val := pred()):
+        if time.monotonic() > end:
+            raise TimeoutError
+        time.sleep(.001)
+    return val
+
+def seed_cache(path: str):
+    '''
+    Points the asset cache to path and stores static data matching the fakes
+    '''
+    cache.cache_dir = path
+    for name, val in (
+            ('realm-euw.json', {'v': VERSION}),
+            ('champion.json', {'data': {v: {'key': str(k), 'name': v} for k, v in CHAMPIONS.items()}}),
+            ('queues.json', [{'queueId': 420, 'description': '5v5 Ranked Solo games'}])):
+        cache._store(name, json.dumps(val).encode(), {'key': VERSION})
+
+def _response(request, status: int, body: bytes, headers: Optional[dict] = None) -> requests.Response:
+    res = requests.Response()
+    res.status_code, res.url, res.request = status, request.url, request
+    res.headers = CaseInsensitiveDict({'Content-Type': 'application/json'} | (headers or {}))
+    res.raw = io.BytesIO(body)
+    res.elapsed = datetime.timedelta()
+    return res
+
+class _FakeServer(BaseAdapter, abc.ABC):
+    '''
+    Delays each response by latency seconds, and answers a throttle fraction
+    of requests with 429 and those set to fail with 500; counts requests by
+    endpoint, ids left out
+    '''
+
+    def __init__(self, *, latency: float = 0., throttle: float = 0., retry_after: float = .05, seed: int = 0):
+        super().__init__()
+        self.latency, self.throttle, self.retry_after = latency, throttle, retry_after
+        self.lk = threading.Lock()
+        self.requests = Counter()
+        self.fail = Counter()  # upcoming requests to answer with 500, by method and endpoint template
+        self.__rng = random.Random(seed)
+
+    def send(self, request, **kwargs):
+        u = urlsplit(request.url)
+        with self.lk:
+            k = (request.method, template(u.path))
+            self.requests[k] += 1
+            throttled = self.__rng.random() < self.throttle
+            if failed := self.fail[k] > 0:
+                self.fail[k] -= 1
+        time.sleep(self.latency)
+        if throttled:
+            return _response(request, 429, b'{}', {'Retry-After': str(self.retry_after)})
+        if failed:
+            return _response(request, 500, b'<html>Internal Server Error</html>')
+        return self.serve(request, u)
+
+    @abc.abstractmethod
+    def serve(self, request, url) -> requests.Response:
+        '''
+        Returns the response to a request that wasn't throttled or failed
+        '''
+
+    def close(self):
+        pass
+
+    @property
+    def total(self) -> int:
+        with self.lk:
+            return sum(self.requests.values())
+
+class FakeLCU(_FakeServer):
+    '''
+    Serves a scripted lobby through the LCU and live client endpoints loltui
+    uses; change it with champ_select(), hover(), in_game(), score() and end()
+    '''
+
+    def __init__(self, *, batch: bool = True, **kwargs):
+        super().__init__(**kwargs)
+        self.batch = batch  # whether multi-id summoner queries are served
+        self.phase = 'None'
+        self.team: list[dict] = []     # champ select myTeam
+        self.game: list[list[int]] = []  # in-game teams of summoner ids
+        self.champs: dict[int, int] = {}  # in-game champs by summoner id
+        self.scores: dict[int, dict] = {}  # in-game scores and items by summoner id
+        self.me = 0
+        self.pages: dict[int, dict] = {}
+        self.writes: list[tuple[float, dict]] = []  # rune page writes, with perf_counter time
+
+    def champ_select(self, sids: list[int], *, me: int = 0, position: str = 'middle'):
+        with self.lk:
+            self.phase, self.me = 'ChampSelect', sids[me]
+            self.team = [{'summonerId': x, 'championId': 0, 'assignedPosition': position if i == me else ''}
+                         for i, x in enumerate(sids)]
+
+    def hover(self, i: int, cid: int):
+        with self.lk:
+            self.team[i] = self.team[i] | {'championId': cid}
+
+    def in_game(self, teams: list[list[int]], champs: list[int]):
+        with self.lk:
+            self.phase, self.team, self.game = 'InProgress', [], teams
+            self.champs = dict(zip((x for t in teams for x in t), champs))
+            self.scores = {x: {'kills': 0, 'deaths': 0, 'assists': 0, 'creepScore': 0, 'items': []}
+                           for x in self.champs}
+
+    def score(self, sid: int, *, item: Optional[int] = None, **kw):
+        '''
+        Adds to in-game scores of given summoner, and gives them an item
+        '''
+        with self.lk:
+            sc = self.scores[sid]
+            sc |= {k: sc[k] + v for k, v in kw.items()}
+            if item:
+                sc['items'] = [*sc['items'], {'itemID': item, 'price': 100 * item, 'count': 1}]
+
+    def end(self):
+        with self.lk:
+            self.phase, self.team, self.game = 'None', [], []
+
+    @staticmethod
+    def summoner(sid: int) -> dict:
+        return {'summonerId': sid, 'displayName': f'Player{sid}', 'puuid': f'{sid:08x}-0000-0000-0000-000000000000', 'accountId': sid}
+
+    @staticmethod
+    def masteries(sid: int) -> list[dict]:
+        cids = sorted(CHAMPIONS, key=lambda c: (c * 7919 + sid) % 160)
+        return [{'championId': c, 'championPoints': 1000 * (400 - 2 * i)} for i, c in enumerate(cids)]
+
+    history = 200  # games played by each summoner
+
+    @classmethod
+    def matches(cls, acc: int, beg: int, end: int) -> dict:
+        '''
+        Returns games from beg to end, newest first; every third is unranked
+        '''
+        return {'games': {'games': [{
+            'gameId': 1000 * acc + cls.history - i,
+            'queueId': 450 if i % 3 == 2 else 420,
+            'participantIdentities': [{'participantId': 1, 'player': {'accountId': acc}}],
+            'participants': [{'participantId': 1, 'stats': {'win': (acc + i) % 4 != 0}}]}
+            for i in range(beg, min(end, cls.history))]}}
+
+    @staticmethod
+    def styles() -> list[dict]:
+        return [{'id': s, 'slots': [*({'perks': [s + 1 + 3 * k + j for j in range(3)]} for k in range(4)),
+                                    *({'perks': x} for x in _SHARDS)]} for s in STYLES]
+
+    def serve(self, request, url):
+        p, m = url.path.lstrip('/'), request.method
+        with self.lk:
+            if url.port == 2999:
+                if p not in ('liveclientdata/allgamedata', 'liveclientdata/playerlist') or not self.game:
+                    raise requests.ConnectionError(request=request)
+                val = [{'summonerName': f'Player{x}', 'championName': CHAMPIONS[c],
+                        'team': 'ORDER' if x in self.game[0] else 'CHAOS', 'items': self.scores[x]['items'],
+                        'scores': {k: v for k, v in self.scores[x].items() if k != 'items'}}
+                       for x, c in self.champs.items()]
+                if p == 'liveclientdata/allgamedata':
+                    val = {'allPlayers': val}
+            elif p == 'lol-patch/v1/game-version':
+                val = VERSION
+            elif p == 'riotclient/region-locale':
+                val = {'region': 'EUW'}
+            elif p == 'lol-gameflow/v1/gameflow-phase':
+                val = self.phase
+            elif p == 'lol-gameflow/v1/session':
+                val = {'gameData': {'queue': {'id': 420}, **{k: [
+                    {'summonerId': str(x), 'summonerName': f'Player{x}'} for x in t]
+                    for k, t in zip(('teamOne', 'teamTwo'), self.game or ([], []))}}}
+            elif p == 'lol-champ-select/v1/session' and self.team:
+                val = {'myTeam': self.team}
+            elif p == 'lol-summoner/v1/current-summoner':
+                val = self.summoner(self.me)
+            elif g := re.fullmatch(r'lol-summoner/v1/summoners/(\d+)', p):
+                val = self.summoner(int(g[1]))
+            elif p == 'lol-summoner/v2/summoners' and self.batch:
+                val = [self.summoner(x) for x in json.loads(parse_qs(url.query)['ids'][0])]
+            elif g := re.fullmatch(r'lol-ranked/v1/ranked-stats/([0-9a-f]{8})-[0-9a-f-]+', p):
+                val = {'queueMap': {'RANKED_SOLO_5x5': {
+                    'previousSeasonEndTier': 'GOLD', 'previousSeasonEndDivision': 'II',
+                    'tier': 'PLATINUM', 'division': ['I', 'II', 'III', 'IV'][int(g[1], 16) % 4]}}}
+            elif g := re.fullmatch(r'lol-collections/v1/inventories/(\d+)/champion-mastery', p):
+                val = self.masteries(int(g[1]))
+            elif g := re.fullmatch(r'lol-match-history/v1/products/lol/([0-9a-f]{8})-[0-9a-f-]+/matches', p):
+                q = parse_qs(url.query)
+                val = self.matches(int(g[1], 16), int(q['begIndex'][0]), int(q['endIndex'][0]))
+            elif p == 'lol-perks/v1/styles':
+                val = self.styles()
+            elif p == 'lol-perks/v1/perks':
+                val = [{'id': x, 'name': f'Perk{x}'} for s in self.styles() for sl in s['slots'] for x in sl['perks']]
+            elif p == 'lol-perks/v1/pages' and m == 'GET':
+                val = list(self.pages.values())
+            elif p == 'lol-perks/v1/pages' and m == 'POST':
+                pid = len(self.pages) + 1
+                self.pages[pid] = val = json.loads(request.body) | {'id': pid}
+                self.writes.append((time.perf_counter(), val))
+            elif (g := re.fullmatch(r'lol-perks/v1/pages/(\d+)', p)) and m == 'PUT':
+                if int(g[1]) not in self.pages:
+                    return _response(request, 404, b'{"message":"page not found"}')
+                self.pages[int(g[1])] = val = json.loads(request.body)
+                self.writes.append((time.perf_counter(), val))
+                return _response(request, 201, b'')
+            else:
+                return _response(request, 404, json.dumps({'httpStatus': 404, 'message': f'{m} {p}'}).encode())
+        return _response(request, 200, json.dumps(val).encode())
+
+class FakeOpgg(_FakeServer):
+    '''
+    Serves rune pages shaped like op.gg's, with the table behind some markup
+    '''
+
+    @staticmethod
+    def runes(champ: str, role: str) -> list[int]:
+        h = sum(map(ord, champ + role))
+        a, b = STYLES[h % 5], STYLES[(h + 1) % 5]
+        return [a + 1 + 3 * k + h % 3 for k in range(4)] + [b + 4 + 3 * k + h % 3 for k in range(2)] + [
+            x[h % 3] for x in _SHARDS]
+
+    def serve(self, request, url):
+        if not (g := re.fullmatch(r'/champion/(\w+)/statistics/(\w+)/rune', url.path)):
+            return _response(request, 404, b'')
+        rs = self.runes(g[1], g[2])
+        tbl = ''.join(f'<img src="//opgg-static.akamaized.net/images/lol/perk{"Shard" if i > 5 else ""}'
+                      f'/{x}.png?image=q_auto">' for i, x in enumerate(rs))
+        page = f'<html>{"<div>x</div>" * 20000}<div class="perk-page__row">{tbl}</td>{"<p>y</p>" * 10000}</html>'
+        return _response(request, 200, page.encode(), {'Content-Type': 'text/html; charset=utf-8'})
@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+import pytest
+import requests
+
+from test.fakes import FakeOpgg
+
+from loltui import playerinfo, runes
+from loltui.client import aclient, client
+
+@pytest.fixture
+def opgg(monkeypatch):
+    s = requests.Session()
+    s.mount('https://www.op.gg', (srv := FakeOpgg()))
+    monkeypatch.setattr(runes, '_opgg', s)
+    return srv
+
+class TestAsyncClient:
+
+    def test_shared(self, fresh):
+        async def main():
+            return await asyncio.gather(*(aclient().get_json('lol-gameflow/v1/gameflow-phase') for _ in range(5)))
+        assert asyncio.run(main()) == ['None'] * 5
+        assert aclient().sync is client()
+        assert fresh.requests['GET', 'lol-gameflow/v1/gameflow-phase'] == 5
+
+    def test_throttled(self, fresh, monkeypatch):
+        monkeypatch.setattr(fresh, 'throttle', .5)
+        async def main():
+            return await asyncio.gather(*(aclient().get(f'lol-summoner/v1/summoners/{i}') for i in range(1, 9)))
+        assert [r.json()['summonerId'] for r in asyncio.run(main())] == list(range(1, 9))
+        assert client().endpoint_stats['lol-summoner/v1/summoners/{id}'].statuses[429] > 0
+
+class TestTasks:
+
+    def test_players_and_runes(self, fresh, opgg):
+        async def players() -> list[tuple[int, int, object]]:
+            return [x async for x in playerinfo._players(['7'])]
+        async def main():
+            return await asyncio.gather(players(), runes.aget_runes('Champion001', 'top'))
+        ps, rs = asyncio.run(main())
+        assert ps[0][2]['displayName'] == 'Player7' and len(ps) == 3
+        assert rs == FakeOpgg.runes('Champion001', 'top')
+
+    def test_cancel(self, opgg, monkeypatch):
+        monkeypatch.setattr(opgg, 'latency', .2)
+        n = len(runes.scrapes)
+        async def main():
+            t = asyncio.create_task(runes.aget_runes('Champion002', 'mid'))
+            await asyncio.sleep(.05)
+            t.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await t
+        asyncio.run(main())
+        time.sleep(.3)
+        assert len(runes.scrapes) == n  # the scrape stopped at its first chunk
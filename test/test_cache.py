@@ -0,0 +1,105 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from loltui import cache
+
+class _Handler(BaseHTTPRequestHandler):
+    hits = []
+
+    def do_GET(self):
+        self.hits.append(self.headers.get('If-None-Match'))
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.end_headers()
+        self.wfile.write(b'payload')
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'cache_dir', str(tmp_path))
+    _Handler.hits = []
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{srv.server_port}/x'
+    srv.shutdown()
+    srv.server_close()
+
+class TestCache:
+
+    def test_fetch_key(self, server):
+        assert cache.fetch('x', server, '1') == b'payload'
+        assert cache.fetch('x', server, '1') == b'payload'
+        assert cache.fetch('x', server, None) == b'payload'
+        assert _Handler.hits == [None]
+        assert cache.fetch('x', server, '2') == b'payload'
+        assert _Handler.hits == [None, '"v1"']
+        assert cache.fetch('x', server, '2') == b'payload'
+        assert len(_Handler.hits) == 2
+
+    def test_fetch_offline(self, server):
+        url = 'http://127.0.0.1:1/x'
+        with pytest.raises(requests.RequestException):
+            cache.fetch('x', url, '1')
+        cache.fetch('x', server, '1')
+        assert cache.fetch('x', url, '2') == b'payload'
+
+    def test_memo_json(self, server):
+        calls = []
+        def fn():
+            calls.append(1)
+            return {'a': 1}
+        assert cache.memo_json('y', '1', fn) == {'a': 1}
+        assert cache.memo_json('y', '1', fn) == {'a': 1}
+        assert cache.memo_json('y', '2', fn) == {'a': 1}
+        assert len(calls) == 2
+
+class TestTTLCache:
+
+    def test_lru(self):
+        c = cache.TTLCache(2)
+        c.set('a', 1, 60)
+        c.set('b', 2, 60)
+        assert c.get('a') == 1
+        c.set('c', 3, 60)
+        assert c.get('b') is None
+        assert [k for k, _, _ in c.items()] == ['a', 'c']
+
+    def test_expiry(self):
+        c = cache.TTLCache(2)
+        c.set('a', 1, -1)
+        c.put('b', 2, 0)
+        assert c.get('a', 'x') == 'x'
+        assert c.get('b') is None
+        assert c.items() == []
+
+class TestLazy:
+
+    def test_once(self):
+        calls = []
+        @cache.lazy
+        def f():
+            calls.append(1)
+            return object()
+        assert not calls
+        assert f() is f()
+        assert len(calls) == 1
+
+    def test_reset(self):
+        @cache.lazy
+        def f():
+            return object()
+        assert not f.ready()
+        a = f()
+        assert f.ready()
+        f.reset()
+        assert not f.ready()
+        assert f() is not a and f() is f()
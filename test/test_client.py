@@ -0,0 +1,68 @@
+import shutil
+import ssl
+import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from test.fakes import FakeLCU, seed_cache
+
+from loltui import cache
+from loltui.client import Client, _PoolAdapter
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    connects = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connects += 1
+
+    def do_GET(self):
+        body = b'"Lobby"'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture(scope='module')
+def cert(tmp_path_factory):
+    if not shutil.which('openssl'):
+        pytest.skip('needs openssl to make a certificate')
+    d = tmp_path_factory.mktemp('tls')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                    '-keyout', str(d / 'key.pem'), '-out', str(d / 'cert.pem'), '-subj', '/CN=127.0.0.1',
+                    '-addext', 'subjectAltName=IP:127.0.0.1'], check=True, capture_output=True)
+    return str(d / 'cert.pem'), str(d / 'key.pem')
+
+@pytest.fixture
+def server(cert):
+    _Handler.connects = 0
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(*cert)
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    srv.socket = ctx.wrap_socket(srv.socket, server_side=True)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv.server_port
+    srv.shutdown()
+    srv.server_close()
+
+class TestPooling:
+
+    def test_reuse(self, tmp_path, cert, server, monkeypatch):
+        monkeypatch.setattr(cache, 'cache_dir', cache.cache_dir)  # restored afterwards
+        seed_cache(str(tmp_path))
+        c = Client(adapter=FakeLCU())
+        c._port, c._lcu.verify = str(server), cert[0]
+        c._lcu.mount('https://', _PoolAdapter(2))
+        for _ in range(5):
+            assert c.get_json('lol-gameflow/v1/gameflow-phase') == 'Lobby'
+        assert _Handler.connects == 1
+        st = c.conn_stats['lcu']
+        assert st.requests == 5 and st.connects == 1
+        assert 0 < st.per_request < st.connect_time
@@ -0,0 +1,45 @@
+import os
+import threading
+
+import pytest
+
+from loltui import cache, discovery
+
+@pytest.fixture
+def install(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'cache_dir', str(tmp_path / 'cache'))
+    monkeypatch.setattr(discovery, '_DEFAULT_DIRS', [])
+    scans = []
+    def find():
+        scans.append(1)
+        return str(tmp_path)
+    monkeypatch.setattr(discovery, '_find_install', find)
+    return tmp_path, scans
+
+def _lock(d, pid=os.getpid(), port=1234):
+    (d / 'lockfile').write_text(f'LeagueClient:{pid}:{port}:tok:https')
+
+class TestDiscovery:
+
+    def test_remembered(self, install):
+        d, scans = install
+        _lock(d)
+        f = discovery.discover()
+        assert (f.port, f.token, f.dir, f.scans) == ('1234', 'tok', str(d), 1)
+        f = discovery.discover()
+        assert f.scans == 0 and len(scans) == 1
+
+    def test_created(self, install):
+        d, scans = install
+        _lock(d)
+        discovery.discover()
+        os.remove(d / 'lockfile')
+        threading.Timer(.1, _lock, (d,)).start()
+        f = discovery.discover(interval=.01, scan_every=60)
+        assert f.port == '1234' and f.scans == 1 and f.elapsed >= .1
+
+    def test_stale(self, install):
+        d, _ = install
+        _lock(d, pid=2 ** 22 + 1)
+        threading.Timer(.1, _lock, (d,), {'port': 5678}).start()
+        assert discovery.discover(interval=.01).port == '5678'
@@ -0,0 +1,64 @@
+import pytest
+
+from loltui.events import Events
+from loltui.polling import Wake
+from test.fakes import FakeEventServer, until
+
+_EPS = ['lol-gameflow/v1/gameflow-phase', 'lol-champ-select/v1/session']
+
+@pytest.fixture
+def stream():
+    srv, wake = FakeEventServer(), Wake()
+    ev = Events(srv.url, _EPS, wake, header={'Authorization': 'Basic x'})
+    until(lambda: len(srv.subscribed) == 2)
+    yield srv, ev, wake
+    ev.close()
+    srv.close()
+
+class TestEvents:
+
+    def test_subscribe(self, stream):
+        srv, ev, _ = stream
+        assert srv.subscribed == {
+            'OnJsonApiEvent_lol-gameflow_v1_gameflow-phase', 'OnJsonApiEvent_lol-champ-select_v1_session'}
+        assert srv.headers[b'authorization'] == b'Basic x'
+        assert ev.connected
+
+    def test_push(self, stream):
+        srv, ev, wake = stream
+        assert ev.get(_EPS[0]) is None
+        wake.clear()
+        srv.push(_EPS[0], 'ChampSelect')
+        assert wake.wait(2)
+        assert ev.get(_EPS[0]) == 'ChampSelect'
+        ev.seed(_EPS[0], 'Lobby')
+        assert ev.get(_EPS[0]) == 'ChampSelect'
+        srv.push(_EPS[1], {'myTeam': []})
+        until(lambda: ev.get(_EPS[1]) == {'myTeam': []})
+        srv.push(_EPS[1], None, 'Delete')
+        until(lambda: ev.get(_EPS[1]) == {})
+
+    def test_seed(self, stream):
+        _, ev, _ = stream
+        ev.seed(_EPS[0], 'Lobby')
+        ev.seed('lol-summoner/v1/current-summoner', {})
+        assert ev.get(_EPS[0]) == 'Lobby'
+        assert ev.get('lol-summoner/v1/current-summoner') is None
+
+    def test_drop(self, stream):
+        srv, ev, wake = stream
+        srv.push(_EPS[0], 'InProgress')
+        until(lambda: ev.get(_EPS[0]) == 'InProgress')
+        wake.clear()
+        srv.drop()
+        assert wake.wait(2)
+        until(lambda: not ev.connected)
+        assert ev.get(_EPS[0]) is None
+
+    def test_not_events(self, stream):
+        srv, ev, wake = stream
+        for msg in ('[0, "session", 1, "server"]', '[3, "call", {}]', 'not json', '{}', '[8, "x", 1]'):
+            srv.send(msg)
+        srv.push(_EPS[0], 'Lobby')
+        until(lambda: ev.get(_EPS[0]) == 'Lobby')
+        assert ev.connected
@@ -0,0 +1,107 @@
+import re
+import threading
+import time
+
+import pytest
+
+from test.fakes import until
+
+from loltui import live, output, polling, session
+from loltui.client import client
+from loltui.live import Line, LivePanel, diff, live_stats
+from loltui.output import _buf, out_rm, out_sz
+
+def _plain(lines: list[str]) -> list[str]:
+    return [re.sub(r'\033\[[\d;]*m', '', x) for x in lines]
+
+@pytest.fixture
+def panel(lcu, monkeypatch):
+    monkeypatch.setattr(live, 'interval', 60)
+    monkeypatch.setattr(output, '_w', lambda s: None)
+    monkeypatch.setattr(output, 'frame_time', 0)
+    lcu.in_game([[1, 2], [3]], [10, 20, 30])
+    n = live_stats().polls
+    p = LivePanel()
+    until(lambda: live_stats().polls > n)  # the poller's first poll
+    yield p
+    p.close()
+    p.clear()
+    lcu.end()
+
+class TestDiff:
+
+    def test_fields(self):
+        a = Line('A', 0, 0, 0, 10, 0)
+        assert diff({}, {'x': a}) == {'x': (0, 1, 2, 3, 4, 5)}
+        assert diff({'x': a}, {'x': a}) == {}
+        assert diff({'x': a}, {'x': a._replace(kills=1, gold=300), 'y': a}) == {
+            'x': (1, 5), 'y': (0, 1, 2, 3, 4, 5)}
+
+class TestLivePanel:
+
+    def test_render(self, panel):
+        n = out_sz()
+        assert panel.update()
+        assert out_sz() == n + 6  # borders, a separator and three players
+        ls = _plain(_buf[n:])
+        assert 'Champion010 0/0/0 0 cs 0.0K' in ls[1]
+        assert '───' in ls[3] and 'Champion030' in ls[4]
+        assert not panel.update()
+
+    def test_delta(self, panel, lcu):
+        panel.update()
+        s = live_stats()
+        assert not panel.poll()  # unchanged, so not decoded
+        assert live_stats().decoded == s.decoded
+        lcu.score(2, kills=2, creepScore=7, item=15)
+        assert panel.poll() and live_stats().decoded == s.decoded + 1
+        assert panel.update()
+        assert live_stats().cells == s.cells + 3
+        assert 'Champion020 2/0/0 7 cs 1.5K' in _plain(_buf)[-4]
+
+    def test_redraw(self, panel):
+        panel.update()
+        n = out_sz()
+        out_rm(6)  # the player info above was redrawn, taking the panel along
+        assert panel.update(redraw=True) and out_sz() == n
+
+class TestSession:
+
+    def test_no_phase_polls(self, lcu, monkeypatch):
+        monkeypatch.setattr(live, 'interval', .01)
+        monkeypatch.setattr(output, '_w', lambda s: None)
+        monkeypatch.setattr(output, 'frame_time', 0)
+        monkeypatch.setattr(polling, 'intervals', polling.intervals | {'InProgress': (1., 1.)})
+        lcu.in_game([[1, 2], [3]], [10, 20, 30])
+        ses = session._get_ingame_session()
+        th = threading.Thread(target=ses.loop, daemon=True)
+        th.start()
+        time.sleep(.1)
+        n, drawn = lcu.requests['GET', 'lol-gameflow/v1/gameflow-phase'], output.out_stats().frames
+        for i in range(20):  # live changes get drawn without polling the phase
+            lcu.score(1, creepScore=1)
+            time.sleep(.02)
+        assert lcu.requests['GET', 'lol-gameflow/v1/gameflow-phase'] - n <= 1
+        assert output.out_stats().frames - drawn >= 5
+        lcu.end()
+        client().wake.set()
+        th.join(5)
+        assert not th.is_alive()
+
+    def test_live_changes_keep_backoff(self, lcu, monkeypatch):
+        monkeypatch.setattr(LivePanel, 'update', lambda self, redraw=False: True)  # always something new
+        monkeypatch.setattr(output, '_w', lambda s: None)
+        monkeypatch.setattr(output, 'frame_time', 0)
+        monkeypatch.setattr(polling, 'intervals', polling.intervals | {'InProgress': (.05, 60.)})
+        lcu.in_game([[1, 2], [3]], [10, 20, 30])
+        ses = session._get_ingame_session()
+        th = threading.Thread(target=ses.loop, daemon=True)
+        th.start()
+        time.sleep(.5)  # the players load, and polling backs off
+        n = lcu.requests['GET', 'lol-gameflow/v1/gameflow-phase']
+        time.sleep(.5)
+        assert lcu.requests['GET', 'lol-gameflow/v1/gameflow-phase'] - n <= 2
+        lcu.end()
+        client().wake.set()
+        th.join(5)
+        assert not th.is_alive()
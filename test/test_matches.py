@@ -0,0 +1,47 @@
+from loltui.matches import MatchStore
+
+class _History:
+    '''
+    Games 1..n, every other one ranked, won when divisible by four
+    '''
+
+    def __init__(self, n: int):
+        self.n, self.calls = n, []
+
+    def __call__(self, beg: int, end: int):
+        self.calls.append((beg, end))
+        return [(g, g % 4 == 0 if g % 2 == 0 else None) for g in range(self.n - beg, max(self.n - end, 0), -1)]
+
+class TestMatchStore:
+
+    def test_backfill(self, tmp_path):
+        s, h = MatchStore(str(tmp_path / 'm.sqlite'), page=10), _History(100)
+        s.sync('a', h, 12).result()
+        assert h.calls == [(0, 10), (10, 20), (20, 30)]
+        assert s.ranked('a') == 15
+        assert s.outcomes('a', 4) == [False, True, False, True]
+
+    def test_incremental(self, tmp_path):
+        s, h = MatchStore(p := str(tmp_path / 'm.sqlite'), page=10), _History(100)
+        assert s.sync('a', h, 5) is None
+        s.close()
+        s, h.n, h.calls = MatchStore(p, page=10), 113, []
+        assert s.sync('a', h, 5) is None
+        assert h.calls == [(0, 10), (10, 20)]
+        assert s.ranked('a') == 11
+        s.sync('a', h, 30).result()
+        assert h.calls[2:] == [(0, 10), (23, 33), (33, 43), (43, 53), (53, 63)]
+        assert s.outcomes('a', 30) == [g % 4 == 0 for g in range(54, 113, 2)]
+
+    def test_exhausted(self, tmp_path):
+        s, h = MatchStore(str(tmp_path / 'm.sqlite'), page=10), _History(15)
+        s.sync('a', h, 20).result()
+        assert s.sync('a', h, 20) is None
+        assert len(h.calls) == 3 and s.ranked('a') == 7
+
+    def test_restart(self, tmp_path):
+        s, h = MatchStore(str(tmp_path / 'm.sqlite'), page=10, max_pages=2), _History(100)
+        s.sync('a', h, 5)
+        h.n = 150
+        s.sync('a', h, 5)
+        assert s.outcomes('a', 100) == [g % 4 == 0 for g in range(132, 151, 2)]
@@ -0,0 +1,24 @@
+from loltui.metrics import Metrics, report, template
+
+class TestMetrics:
+
+    def test_template(self):
+        assert template('lol-summoner/v1/summoners/123') == 'lol-summoner/v1/summoners/{id}'
+        assert template('lol-ranked/v1/ranked-stats/0b1c2d3e-aaaa-bbbb-cccc-0123456789ab') == \
+            'lol-ranked/v1/ranked-stats/{id}'
+        assert template('lol-collections/v1/inventories/7/champion-mastery?x=1') == \
+            'lol-collections/v1/inventories/{id}/champion-mastery'
+        assert template('lol-patch/v1/game-version') == 'lol-patch/v1/game-version'
+
+    def test_record(self):
+        m = Metrics()
+        for lat in (.001, .002, .03, 7.):
+            m.record('a', lat, 10, 200)
+        m.record('a', .001, 0, 429)
+        m.retried('a', .5)
+        s = m.snapshot()['a']
+        assert (s.count, s.bytes, s.retry_time, s.statuses) == (5, 40, .5, {200: 4, 429: 1})
+        assert s.quantile(.5) == .005
+        assert s.quantile(.7) == .05
+        assert s.quantile(1) == float('inf')
+        assert len(report(m.snapshot())) == 2
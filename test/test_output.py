@@ -1,6 +1,18 @@
+import pytest
+
+from loltui import output
 from loltui.output import *
 from loltui.output import _buf
 
+@pytest.fixture
+def written(monkeypatch):
+    output._flush()
+    ws = []
+    monkeypatch.setattr(output, '_w', ws.append)
+    monkeypatch.setattr(output, 'frame_time', 0)
+    yield ws
+    output._flush()
+
 class TestOutput:
 
     def test_sz(self):
@@ -67,3 +79,48 @@ class TestOutput:
                              f'{cgray("│")} 2c {cgray("│")}']
         out_rm(5)
         assert out_sz() == 0
+
+    def test_box_cells(self):
+        assert out_sz() == 0
+        red = colorizer(1)
+        box([Cell('ab', red), Cell('c')],
+            [(Cell('d'), Cell('e', red)), Cell('', cgray, '-'), Cell('f')],
+            'g\0hh\0i')
+        assert out_sz() == 5
+        assert _buf[1] == f'{cgray("│")} {red("ab")}c   {cgray("│")}'
+        assert _buf[2] == f'{cgray("│")} d{red("e")}{cgray("--")}f {cgray("│")}'
+        assert _buf[3] == f'{cgray("│")} g hhi {cgray("│")}'
+        out_rm(5)
+        assert out_sz() == 0
+
+    def test_diff(self, written):
+        out(['a', 'b', 'c'])
+        assert written == ['\ra\nb\nc\n']
+        written.clear()
+        with frame():
+            out_rm(3)
+            out(['a', 'X', 'c'])
+        assert written == [f'\033[2A\rX\033[K\033[2B\r']
+        written.clear()
+        with frame():
+            out_rm(3)
+            out(['a', 'X', 'c'])
+        assert written == []
+        out_rm(2)
+        assert written == [f'\033[2A\r\033[J']
+        out_rm()
+        assert out_sz() == 0
+
+    def test_frame_cap(self, written, monkeypatch):
+        monkeypatch.setattr(output, 'frame_time', 60)
+        frames = out_stats().frames
+        out('a')
+        out('b')
+        assert written == []
+        output._flush()
+        assert written == ['\ra\nb\n']
+        assert out_stats().frames == frames + 1
+        out_rm(2)
+        output._flush()
+        assert out_sz() == 0
+        assert written[-1] == '\033[2A\r\033[J'
@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+from loltui import playerinfo
+from loltui.output import Cell
+
+def _id2players(sids) -> list[tuple]:
+    ps = [[None, None, None] for _ in sids]
+    async def load():
+        async for i, k, v in playerinfo._players(sids):
+            ps[i][k] = v
+    asyncio.run(load())
+    return [tuple(x) for x in ps]
+
+class TestPlayers:
+
+    def test_batch(self, fresh):
+        ps = _id2players([str(x) for x in range(1, 11)])
+        assert [d['summonerId'] for d, _, _ in ps] == list(range(1, 11))
+        assert fresh.requests['GET', 'lol-summoner/v2/summoners'] == 1
+        assert fresh.requests['GET', 'lol-summoner/v1/summoners/{id}'] == 0
+        assert fresh.total == 21
+        _id2players([3, 11])
+        assert fresh.requests['GET', 'lol-summoner/v2/summoners'] == 2
+
+    def test_fallback(self, fresh):
+        fresh.batch = False
+        ps = _id2players([1, 2, 1])
+        assert [d['summonerId'] for d, _, _ in ps] == [1, 2, 1]
+        assert fresh.requests['GET', 'lol-summoner/v2/summoners'] == 1
+        assert fresh.requests['GET', 'lol-summoner/v1/summoners/{id}'] == 2
+        _id2players([3])
+        assert fresh.requests['GET', 'lol-summoner/v2/summoners'] == 1
+
+class TestProgressive:
+
+    @staticmethod
+    def texts(pi: playerinfo.PlayerInfo) -> list[str]:
+        return [c.text for row in pi.get() for col in row for c in ([col] if isinstance(col, Cell) else col)]
+
+    def test_placeholders(self, fresh, monkeypatch):
+        monkeypatch.setattr(fresh, 'latency', .05)
+        n, shown = len(playerinfo.loads), []
+        pi = playerinfo.PlayerInfo((5, 0), ['1', '2'], lambda: shown.append(1))
+        assert pi.update([0, 3]) and shown
+        assert '…' in (ts := self.texts(pi)) and 'Player1' not in ts
+        assert 'Champion003' in ts  # the hovered champ shows without its mastery
+        end = time.monotonic() + 5
+        while len(playerinfo.loads) == n and time.monotonic() < end:
+            time.sleep(.01)
+        assert pi.update([0, 3])
+        assert {'Player1', 'Player2'} <= set(ts := self.texts(pi)) and '…' not in ts
+        assert playerinfo.loads[-1].players == 2 and playerinfo.loads[-1].requests == 5
+        assert .05 <= playerinfo.loads[-1].first <= playerinfo.loads[-1].loaded
+
+    def _loaded(self, sids: list[str]) -> list[str]:
+        n = len(playerinfo.loads)
+        pi = playerinfo.PlayerInfo((5, 0), sids, lambda: None)
+        end = time.monotonic() + 5
+        while len(playerinfo.loads) == n and time.monotonic() < end:
+            time.sleep(.01)
+        assert pi.update([0] * len(sids))
+        return self.texts(pi)
+
+    def test_failed_rank(self, fresh):
+        fresh.fail['GET', 'lol-ranked/v1/ranked-stats/{id}'] = 1
+        ts = self._loaded(['1', '2'])
+        assert {'Player1', 'Player2'} <= set(ts) and '…' not in ts
+        assert ts.count('?') == 1  # only the failed rank
+        assert sum(x.endswith('K') for x in ts) == 20  # both players' masteries
+
+    def test_failed_summoners(self, fresh):
+        fresh.fail['GET', 'lol-summoner/v2/summoners'] = 1
+        fresh.fail['GET', 'lol-summoner/v1/summoners/{id}'] = 2
+        ts = self._loaded(['1', '2'])
+        assert 'Player1' not in ts and '…' not in ts and ts.count('?') == 6
+
+    def test_failed_outcomes(self, fresh, monkeypatch):
+        wins_losses = playerinfo._wins_losses
+        def flaky(info, timeout=None):
+            if info['summonerId'] == 1:
+                raise KeyError('games')
+            return wins_losses(info, timeout)
+        monkeypatch.setattr(playerinfo, '_wins_losses', flaky)
+        pi = playerinfo.PlayerInfo((5, 0), ['1', '2'], lambda: None)
+        end = time.monotonic() + 5
+        while not (pi.update([0, 0]) and '•' in self.texts(pi)):  # the other player's outcomes
+            assert time.monotonic() < end
+            time.sleep(.01)
+
+    def test_failed_load(self, fresh, monkeypatch):
+        async def players(sids):
+            raise RuntimeError('bug')
+            yield
+        monkeypatch.setattr(playerinfo, '_players', players)
+        pi = playerinfo.PlayerInfo((5, 0), ['1', '2'], lambda: None)
+        end = time.monotonic() + 5
+        while not pi.update([0, 0]) or '…' in self.texts(pi):
+            assert time.monotonic() < end
+            time.sleep(.01)
+        assert self.texts(pi).count('?') == 6
+
+class TestMasteries:
+
+    def test_index(self):
+        m = playerinfo.Masteries([{'championId': c, 'championPoints': p, 'chestGranted': True}
+                                  for c, p in ((7, 900), (3, 500), (120, 20))])
+        assert len(m) == 3
+        assert list(m.top(2)) == [(7, 900), (3, 500)]
+        assert [m.index(c) for c in (7, 3, 120, 0, 5, 121, -1)] == [0, 1, 2, None, None, None, None]
+        assert m.points[2] == 20
+
+    def test_empty(self):
+        m = playerinfo.Masteries([])
+        assert list(m.top(10)) == [] and m.index(1) is None
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from loltui import polling
+from loltui.polling import Poller, Wake
+
+@pytest.fixture
+def poller(monkeypatch):
+    monkeypatch.setattr(polling, 'intervals', {'A': (.01, .04), None: (.02, .02)})
+    n = [0]
+    p = Poller(wake := Wake(), lambda: n[0])
+    return p, wake, n
+
+class TestPoller:
+
+    def test_backoff(self, poller):
+        p, wake, _ = poller
+        seen = []
+        for active in (False, False, False, False, True, False):
+            p.wait('A', active)
+            seen.append(p.interval)
+        assert seen == [.01, .02, .04, .04, .01, .02]
+        p.wait('Lobby')
+        assert p.interval == .02
+        p.wait('A')
+        assert p.interval == .01
+
+    def test_wake(self, poller):
+        p, wake, _ = poller
+        p.wait('A')
+        p.wait('A')
+        threading.Timer(.005, wake.set).start()
+        t = time.monotonic()
+        p.wait('A')  # .04 unless woken
+        assert time.monotonic() - t < .03
+        p.wait('A')
+        assert p.interval == .01 and not wake.is_set()
+
+    def test_redraw(self, poller):
+        p, wake, n = poller
+        p.wait('A')
+        p.wait('A')
+        drawn = []
+        threading.Timer(.005, wake.redraw).start()
+        t = time.monotonic()
+        p.wait('A', redraw=lambda: drawn.append(time.monotonic() - t))
+        assert len(drawn) == 1 and drawn[0] < .03  # drawn at once ...
+        assert time.monotonic() - t >= .04         # ... without cutting the sleep short
+        assert p.interval == .04
+
+    def test_take_any(self):
+        w = Wake()
+        w.set()
+        assert w.is_set() and w.take_any(0) == (True, False) and not w.is_set()
+        assert w.take_any(0) == (False, False)
+        w.redraw()
+        w.set()
+        assert w.take_any(0) == (True, True) and w.take_any(0) == (False, False)
+        threading.Timer(.005, w.set).start()
+        assert w.take_any(1) == (True, False) and not w.wait(0)
+
+    def test_stats(self, poller):
+        p, _, n = poller
+        p.wait('A')
+        n[0] += 3
+        p.wait('B')
+        n[0] += 2
+        p.wait('B')
+        st = p.stats
+        assert st['A'].requests == 3 and st['B'].requests == 2
+        assert st['A'].time >= .01
+        assert st['A'].per_minute == pytest.approx(3 / st['A'].time * 60)
@@ -0,0 +1,50 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from loltui import ratelimit
+from loltui.ratelimit import BACKGROUND, INTERACTIVE, Scheduler
+
+class TestScheduler:
+
+    def test_burst(self):
+        s = Scheduler(1000, 3)
+        for _ in range(3):
+            s.acquire()
+        assert s.stats == (0, 0, 0)
+        s.acquire()
+        assert s.stats.queued == 1
+
+    def test_priority(self, monkeypatch):
+        t0, frozen, queued, seen = time.monotonic(), threading.Event(), threading.Semaphore(0), set()
+        def clock() -> float:  # no tokens refill until every request is queued
+            if not frozen.is_set():
+                return time.monotonic()
+            if (th := threading.current_thread()) is not threading.main_thread() and th not in seen:
+                seen.add(th)
+                queued.release()
+            return t0
+        frozen.set()
+        monkeypatch.setattr(ratelimit, 'time', SimpleNamespace(monotonic=clock))
+        s = Scheduler(20, 1)
+        s.acquire()
+        order = []
+        def req(prio):
+            s.acquire(prio)
+            order.append(prio)
+        ts = [threading.Thread(target=req, args=(p,)) for p in (BACKGROUND, INTERACTIVE, INTERACTIVE)]
+        for t in ts:
+            t.start()
+            queued.acquire()  # it's waiting for a token
+        frozen.clear()
+        for t in ts:
+            t.join()
+        assert order == [INTERACTIVE, INTERACTIVE, BACKGROUND]
+
+    def test_throttle(self):
+        s = Scheduler(1000, 10)
+        s.throttle(.1)
+        t = time.monotonic()
+        s.acquire()
+        assert time.monotonic() - t >= .09
+        assert s.stats == (0, 1, 1)
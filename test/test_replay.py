@@ -0,0 +1,77 @@
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from loltui import replay
+
+class _Handler(BaseHTTPRequestHandler):
+    phase = 'Lobby'
+
+    def do_GET(self):
+        body = json.dumps(self.phase if self.path == '/phase' else {'path': self.path}).encode()
+        self.send_response(200 if self.path != '/missing' else 404)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_PUT(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    _Handler.phase = 'Lobby'
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{srv.server_port}'
+    srv.shutdown()
+    srv.server_close()
+
+def _replaying(path, realtime) -> requests.Session:
+    s = requests.Session()
+    s.mount('http://', replay.Replayer(replay.load(path), realtime))
+    return s
+
+class TestReplay:
+
+    def test_roundtrip(self, server, tmp_path):
+        s, rec = requests.Session(), replay.Recorder(p := str(tmp_path / 'rec.gz'))
+        rec.attach(s)
+        s.get(f'{server}/phase')
+        _Handler.phase = 'ChampSelect'
+        s.get(f'{server}/phase')
+        s.get(f'{server}/a?x=1')
+        s.get(f'{server}/missing')
+        s.put(f'{server}/page', json={'id': 1})
+        rec.close()
+
+        s = _replaying(p, False)
+        assert [s.get(f'http://127.0.0.1:1/phase').json() for _ in range(3)] == [
+            'Lobby', 'ChampSelect', 'ChampSelect']
+        assert s.get('http://127.0.0.1:1/a?x=1').json() == {'path': '/a?x=1'}
+        assert s.get('http://127.0.0.1:1/missing').status_code == 404
+        assert s.put('http://127.0.0.1:1/page', json={'id': 1}).status_code == 204
+        assert s.put('http://127.0.0.1:1/page', json={'id': 2}).status_code == 404
+        with pytest.raises(requests.ConnectionError):
+            s.get('http://127.0.0.1:2999/liveclientdata/allgamedata')
+
+    def test_realtime(self, tmp_path):
+        with gzip.open(p := str(tmp_path / 'rec.gz'), 'wt') as f:
+            for t, phase in ((0, 'Lobby'), (.2, 'ChampSelect')):
+                f.write(json.dumps(replay.Exchange(t, 'GET', 'phase', None, 200, {}, json.dumps(phase), .05)) + '\n')
+        s = _replaying(p, True)
+        t = time.perf_counter()
+        assert s.get('http://127.0.0.1:1/phase').json() == 'Lobby'
+        assert time.perf_counter() - t >= .05
+        assert s.get('http://127.0.0.1:1/phase').json() == 'Lobby'
+        time.sleep(.2)
+        assert s.get('http://127.0.0.1:1/phase').json() == 'ChampSelect'
@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from test.fakes import FakeOpgg, until
+
+from loltui import runes, session
+from loltui.cache import TTLCache
+
+@pytest.fixture
+def pages(lcu):
+    yield lcu
+    lcu.pages.clear()  # so the next writer starts without a managed page
+
+class TestFindTable:
+
+    page = f'<p>é€😀</p>{"x" * 50}{runes._tblbeg}<i>perk/8005.png?image=q_auto ✓</i>{runes._tblend}{"y" * 500}'.encode()
+
+    @staticmethod
+    def split(b: bytes, n: int) -> list[bytes]:
+        return [b[i:i + n] for i in range(0, len(b), n)]
+
+    @pytest.mark.parametrize('n', [1, 3, 7, 29, 1 << 14])
+    def test_chunks(self, n):
+        chunks = iter(self.split(self.page, n))
+        tbl, peak = runes._find_table(runes._decoded(chunks))
+        assert tbl == '<i>perk/8005.png?image=q_auto ✓</i>'
+        if n < 500:  # only the table was buffered, and reading stopped at its end
+            assert peak <= 2 * len(runes._tblbeg) + len(tbl) + len(runes._tblend) + n
+            assert next(chunks, None) is not None
+
+    def test_split_marker(self):
+        i = self.page.index(runes._tblbeg.encode()) + 5
+        j = self.page.index(runes._tblend.encode()) + 2
+        tbl, _ = runes._find_table(runes._decoded([self.page[:i], self.page[i:j], self.page[j:]]))
+        assert tbl == '<i>perk/8005.png?image=q_auto ✓</i>'
+
+    def test_missing(self):
+        assert runes._find_table(runes._decoded(self.split(b'<p>\xc3\xa9</p>' * 20, 3)))[0] is None
+
+class TestPageWriter:
+
+    def test_coalesced(self, lcu, pages):
+        w, n, gets = runes._PageWriter(.1), len(lcu.writes), lcu.requests['GET', 'lol-perks/v1/pages']
+        for champ in ('Champion001', 'Champion002', 'Champion003'):
+            w.submit(champ, FakeOpgg.runes(champ, 'top'))
+        until(lambda: len(lcu.writes) > n)
+        time.sleep(.2)
+        assert len(lcu.writes) == n + 1 and lcu.writes[-1][1]['name'] == 'lt: Champion003'
+        w.submit('Champion004', FakeOpgg.runes('Champion004', 'top'))
+        until(lambda: len(lcu.writes) > n + 1)
+        assert lcu.writes[-1][1]['name'] == 'lt: Champion004'
+        assert lcu.requests['GET', 'lol-perks/v1/pages'] == gets + 1  # the page id is kept
+
+
+    def test_error_status(self, lcu):
+        w, rs = runes._PageWriter(0), FakeOpgg.runes('Champion001', 'top')
+        lcu.fail['POST', 'lol-perks/v1/pages'] = 1
+        w.submit('a', rs)
+        assert 'code 500' in until(w.pop_error)
+        n = len(lcu.writes)
+        w.submit('b', rs)
+        until(lambda: len(lcu.writes) > n)
+        assert lcu.writes[-1][1]['name'] == 'lt: b' and w.pop_error() is None
+
+    def test_exception(self, lcu):
+        w, rs = runes._PageWriter(0), FakeOpgg.runes('Champion002', 'mid')
+        w.submit('bad', [1] * 9)  # no such perks
+        assert 'Failed to set runes' in until(w.pop_error)
+        n = len(lcu.writes)
+        w.submit('good', rs)
+        until(lambda: len(lcu.writes) > n)
+        assert lcu.writes[-1][1]['selectedPerkIds'] == rs
+
+class TestFetch:
+
+    def test_exception(self, lcu, monkeypatch):
+        def boom(*args):
+            raise KeyError('boom')
+        monkeypatch.setattr(session, 'get_runes', boom)
+        monkeypatch.setattr(session, '_runes', lambda c=TTLCache(8): c)
+        assert session._get_rune((3, 1)) is None
+        assert 'boom' in until(lambda: session._get_rune((3, 1)))
+        assert (3, 1) not in session._rune_work